@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Run independent, I/O bound functions, such as database queries, concurrently on a bounded pool
+of threads. Each thread uses its own database connections, which are handled after each task as
+Django handles them after each request: with ``CONN_MAX_AGE = 0``, the default, they are closed,
+otherwise they are kept open for the next tasks, until they are older than ``CONN_MAX_AGE`` or an
+error made them unusable. On Django 1.5, they are always closed.
+
+The size of the pool is set with ``DJANGULAR_THREAD_POOL_SIZE`` (default 4). Setting it to 0 or
+1 runs everything serially in the calling thread.
+"""
+import threading
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.db import connections
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPool(getattr(settings, 'DJANGULAR_THREAD_POOL_SIZE', 4))
+    return _pool
+
+
+def can_run_concurrently():
+    """
+    Return False, if functions must run in the calling thread: if the pool is disabled, if called
+    from within the pool, or if a database connection of this thread is inside a transaction or
+    uses an in-memory SQLite database, whose data other connections would not see.
+    """
+    if getattr(settings, 'DJANGULAR_THREAD_POOL_SIZE', 4) <= 1 or getattr(_local, 'in_pool', False):
+        return False
+    for connection in connections.all():
+        if _in_transaction(connection):
+            return False
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            return False
+    return True
+
+
+def _in_transaction(connection):
+    if hasattr(connection, 'in_atomic_block'):
+        return connection.in_atomic_block
+    # Django 1.5 has managed transactions instead of atomic blocks
+    return connection.is_managed()
+
+
+def _release_connections():
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if not hasattr(connection, 'close_if_unusable_or_obsolete') or connection.settings_dict.get('CONN_MAX_AGE', 0) == 0:
+            connection.close()
+        else:
+            connection.close_if_unusable_or_obsolete()
+
+
+def _run_in_pool(func):
+    _local.in_pool = True
+    try:
+        return func()
+    finally:
+        _local.in_pool = False
+        _release_connections()
+
+
+def run_concurrently(*funcs):
+    """
+    Call each function without arguments and return their results, in the order of ``funcs``.
+    If a function raises an exception, it is raised in the calling thread, after all functions
+    have finished.
+    """
+    if len(funcs) < 2 or not can_run_concurrently():
+        return [func() for func in funcs]
+    pool = get_pool()
+    results = [pool.apply_async(_run_in_pool, (func,)) for func in funcs]
+    for result in results:
+        result.wait()
+    return [result.get() for result in results]
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Run slow actions, such as building reports or importing data, as background jobs, so that the
+request answers immediately and the web worker is free for other requests. The state of each job
+is kept in Django's cache, so that any process can report it.
+
+Jobs are handed to an executor, set with ``DJANGULAR_JOB_EXECUTOR``. The default executor runs
+them on a local pool of ``DJANGULAR_JOB_WORKERS`` threads (default 2). An executor is any class
+with a method ``submit``, accepting a function without arguments. Since these functions are bound
+to the view and its request, they can not be pickled, so executors must run them in the same
+process.
+
+If django-websocket-redis is installed, the final state of each job is also published to its
+owner on the facility ``DJANGULAR_JOB_FACILITY`` (default 'djangular-jobs').
+"""
+import logging
+import threading
+import uuid
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils.encoding import force_text
+from django.utils.module_loading import import_by_path
+
+try:
+    from ws4redis.publisher import RedisPublisher
+    from ws4redis.redis_store import RedisMessage
+except ImportError:
+    RedisPublisher = None
+
+logger = logging.getLogger('djangular')
+
+JOB_KEY = 'djangular:job:%s'
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ThreadPoolExecutor(object):
+    """
+    Run jobs on a local pool of threads. Jobs are lost, if the process terminates.
+    """
+    def __init__(self):
+        self._pool = ThreadPool(getattr(settings, 'DJANGULAR_JOB_WORKERS', 2))
+
+    def submit(self, func):
+        self._pool.apply_async(_run_on_worker, (func,))
+
+
+def _run_on_worker(func):
+    try:
+        func()
+    finally:
+        # the connections opened by this job are not used by a request
+        for connection in connections.all():
+            if connection.connection is not None and not getattr(connection, 'in_atomic_block', False):
+                connection.close()
+
+
+class ImmediateExecutor(object):
+    """
+    Run jobs in the calling thread, before the response is returned. Use this for tests.
+    """
+    def submit(self, func):
+        func()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                path = getattr(settings, 'DJANGULAR_JOB_EXECUTOR', 'djangular.core.jobs.ThreadPoolExecutor')
+                _executor = import_by_path(path)()
+    return _executor
+
+
+def get_job_owner(request):
+    """
+    Return the user and the session, which may query the state of jobs submitted by ``request``.
+    Anonymous requests without a session own nothing.
+    """
+    user = getattr(request, 'user', None)
+    session = getattr(request, 'session', None)
+    return {
+        'user': user.get_username() if user is not None and user.is_authenticated() else None,
+        'session': getattr(session, 'session_key', None),
+    }
+
+
+def get_job(job_id):
+    """
+    Return the state of the job as a dictionary, or None if it is unknown or has expired.
+    """
+    return cache.get(JOB_KEY % job_id)
+
+
+def _update_job(state, **kwargs):
+    state.update(kwargs)
+    cache.set(JOB_KEY % state['job'], state, getattr(settings, 'DJANGULAR_JOB_TIMEOUT', 3600))
+
+
+def submit_job(func, owner=None):
+    """
+    Submit the function without arguments to the executor and return the state of its job. The
+    result of the function must be encodable as JSON.
+    """
+    state = {'job': uuid.uuid4().hex, 'status': PENDING, 'owner': owner or {}}
+    _update_job(state)
+    get_executor().submit(partial(run_job, dict(state), func))
+    return state
+
+
+def run_job(state, func):
+    _update_job(state, status=RUNNING)
+    try:
+        _update_job(state, status=DONE, result=func())
+    except ValueError as err:
+        _update_job(state, status=FAILED, error=force_text(err))
+    except Exception:
+        logger.exception('Background job %s failed', state['job'])
+        _update_job(state, status=FAILED, error='Internal error')
+    publish_job(state)
+
+
+def publish_job(state):
+    """
+    Push the state of the job to its owner through django-websocket-redis, if installed.
+    """
+    facility = getattr(settings, 'DJANGULAR_JOB_FACILITY', 'djangular-jobs')
+    owner = state['owner']
+    if RedisPublisher is None or not facility or not (owner.get('user') or owner.get('session')):
+        return
+    message = DjangoJSONEncoder().encode(dict((key, value) for key, value in state.items() if key != 'owner'))
+    try:
+        publisher = RedisPublisher(facility=facility, users=filter(None, [owner.get('user')]),
+                                   sessions=filter(None, [owner.get('session')]))
+        publisher.publish_message(RedisMessage(message))
+    except Exception:
+        logger.exception('The state of background job %s could not be published', state['job'])
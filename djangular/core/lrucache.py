@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A thread safe dictionary holding at most ``maxsize`` items. When full, adding another item
+    evicts the least recently used one.
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Collapse identical concurrent computations, such as the payload of a popular list, into one.
+While a function is computing the result for a key, other threads calling ``single_flight`` with
+the same key wait for this result, rather than computing it again. If it does not arrive within
+``DJANGULAR_SINGLE_FLIGHT_TIMEOUT`` seconds (default 10), they compute it themselves.
+
+With ``DJANGULAR_SINGLE_FLIGHT_SHARED = True``, the computation is also shared between processes:
+the process computing a key holds a lock in Django's cache, and puts the result into the cache,
+where the other processes pick it up, waiting for the same timeout. This requires a cache shared by all
+processes, such as memcached, and results which can be pickled.
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+FLIGHT_LOCK_KEY = 'djangular:flight-lock:%s'
+FLIGHT_RESULT_KEY = 'djangular:flight-result:%s:%s'
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def single_flight(key, func, shared=None):
+    """
+    Call ``func`` without arguments and return its result, unless another thread is already
+    computing the result for ``key``; then wait for that result instead. Exceptions are raised
+    in all waiting threads. If ``shared`` is None, ``DJANGULAR_SINGLE_FLIGHT_SHARED`` decides
+    whether to collapse the computations of other processes as well.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is None:
+            flight = _flights[key] = Flight()
+            leader = True
+        else:
+            leader = False
+    if not leader:
+        if not flight.done.wait(getattr(settings, 'DJANGULAR_SINGLE_FLIGHT_TIMEOUT', 10)):
+            # the leader hangs
+            return func()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    try:
+        if shared is None:
+            shared = getattr(settings, 'DJANGULAR_SINGLE_FLIGHT_SHARED', False)
+        flight.result = call_shared(key, func) if shared else func()
+        return flight.result
+    except Exception as err:
+        flight.error = err
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def call_shared(key, func):
+    """
+    Call ``func``, unless another process is computing the result for ``key``; then wait for
+    that process to put the result into the cache.
+    """
+    timeout = getattr(settings, 'DJANGULAR_SINGLE_FLIGHT_TIMEOUT', 10)
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    lock_key = FLIGHT_LOCK_KEY % digest
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout):
+        try:
+            result = func()
+            cache.set(FLIGHT_RESULT_KEY % (digest, token), result, timeout)
+            return result
+        finally:
+            cache.delete(lock_key)
+    token = cache.get(lock_key)
+    deadline = time.time() + timeout
+    delay = 0.005
+    while token is not None and time.time() < deadline:
+        result_key = FLIGHT_RESULT_KEY % (digest, token)
+        values = cache.get_many([result_key, lock_key])
+        if result_key in values:
+            return values[result_key]
+        if values.get(lock_key) != token:
+            # the other process failed, or its lock expired
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    return func()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Publish updates to the clients of a websocket facility, numbered by a sequence per facility, so
+that clients reconnecting after a disconnect fetch only the updates they missed, rather than
+reloading everything.
+
+The last ``DJANGULAR_UPDATES_HISTORY`` updates (default 100) of each facility are kept in Django's
+cache for ``DJANGULAR_UPDATES_TIMEOUT`` seconds (default 3600). If django-websocket-redis is
+installed, each update is also broadcast on its facility, as ``{"seq": 42, "data": {...}}``.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    from ws4redis.publisher import RedisPublisher
+    from ws4redis.redis_store import RedisMessage
+except ImportError:
+    RedisPublisher = None
+
+logger = logging.getLogger('djangular')
+
+UPDATES_SEQUENCE_KEY = 'djangular:updates:%s'
+UPDATE_KEY = 'djangular:updates:%s:%d'
+UPDATES_LOCK_KEY = 'djangular:updates-lock:%s'
+SEQUENCE_TIMEOUT = 86400 * 365
+
+
+def get_sequence(facility):
+    """
+    Return the sequence number of the last update published on ``facility``, or 0.
+    """
+    return cache.get(UPDATES_SEQUENCE_KEY % facility, 0)
+
+
+def _store_update(facility, data):
+    """
+    Store ``data`` under the next sequence number of ``facility``, before this number becomes
+    the current one, so that readers never see a sequence number whose update is missing.
+    Publishers of the same facility are serialized by a lock in the cache.
+    """
+    lock_key = UPDATES_LOCK_KEY % facility
+    deadline = time.time() + 1
+    while not cache.add(lock_key, 1, 5):
+        if time.time() > deadline:
+            logger.warning('Lock of facility %s not released, publishing without it', facility)
+            break
+        time.sleep(0.001)
+    try:
+        seq = get_sequence(facility) + 1
+        cache.set(UPDATE_KEY % (facility, seq), data, getattr(settings, 'DJANGULAR_UPDATES_TIMEOUT', 3600))
+        cache.set(UPDATES_SEQUENCE_KEY % facility, seq, SEQUENCE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return seq
+
+
+def publish_update(facility, data):
+    """
+    Number the update with the next sequence of ``facility``, keep it for replays and broadcast
+    it on this facility. Return its sequence number.
+    """
+    seq = _store_update(facility, data)
+    if RedisPublisher is not None:
+        message = DjangoJSONEncoder().encode({'seq': seq, 'data': data})
+        try:
+            RedisPublisher(facility=facility, broadcast=True).publish_message(RedisMessage(message))
+        except Exception:
+            logger.exception('Update %d of facility %s could not be published', seq, facility)
+    return seq
+
+
+def get_updates_since(facility, since):
+    """
+    Return a list of the updates published on ``facility`` after the sequence number ``since``,
+    as dictionaries containing ``seq`` and ``data``. Return None, if some of them are not kept
+    anymore, or if the sequence has been restarted, so that the client must reload its data.
+    """
+    current = get_sequence(facility)
+    if since > current:
+        return None
+    if since == current:
+        return []
+    if current - since > getattr(settings, 'DJANGULAR_UPDATES_HISTORY', 100):
+        return None
+    keys = [UPDATE_KEY % (facility, seq) for seq in range(since + 1, current + 1)]
+    values = cache.get_many(keys)
+    if len(values) != len(keys):
+        return None
+    return [{'seq': seq, 'data': values[key]} for seq, key in zip(range(since + 1, current + 1), keys)]
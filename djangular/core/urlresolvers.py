@@ -1,21 +1,20 @@
+# -*- coding: utf-8 -*-
+import weakref
 from django.core.urlresolvers import (get_resolver, get_urlconf, get_script_prefix,
     get_ns_resolver, iri_to_uri, NoReverseMatch)
+from django.utils.http import urlquote
+from django.utils.regex_helper import normalize
+from djangular.core.lrucache import LRUCache
 
+# Memoized URL maps. They are kept per resolver, hence a changed urlconf, or a call to
+# ``clear_url_caches()``, implicitly invalidates all maps computed for the old resolver.
+_urls_cache = weakref.WeakKeyDictionary()
 
-def urls_by_namespace(namespace, urlconf=None, args=None, kwargs=None, prefix=None, current_app=None):
+
+def _get_namespace_resolver(resolver, namespace, current_app=None):
     """
-    Return a dictionary containing the name together with the URL of all configured
-    URLs specified for this namespace.
+    Return the resolver responsible for the given namespace.
     """
-    if urlconf is None:
-        urlconf = get_urlconf()
-    resolver = get_resolver(urlconf)
-    args = args or []
-    kwargs = kwargs or {}
-
-    if prefix is None:
-        prefix = get_script_prefix()
-
     if not namespace or not isinstance(namespace, basestring):
         raise AttributeError('Attribute namespace must be of type string')
     path = namespace.split(':')
@@ -51,6 +50,79 @@ def urls_by_namespace(namespace, urlconf=None, args=None, kwargs=None, prefix=No
                     (key, ':'.join(resolved_path)))
             else:
                 raise NoReverseMatch("%s is not a registered namespace" % key)
-    resolver = get_ns_resolver(ns_pattern, resolver)
-    return dict((name, iri_to_uri(resolver._reverse_with_prefix(name, prefix, *args, **kwargs)))
-                for name in resolver.reverse_dict.keys() if isinstance(name, basestring))
+    return get_ns_resolver(ns_pattern, resolver)
+
+
+def _cached(resolver, key, func):
+    """
+    Return the value memoized for ``key`` by this resolver, computing it with ``func`` on a miss.
+    """
+    try:
+        hash(key)
+    except TypeError:
+        return func()
+    cache = _urls_cache.get(resolver)
+    if cache is None:
+        cache = _urls_cache.setdefault(resolver, LRUCache(maxsize=64))
+    value = cache.get(key)
+    if value is None:
+        value = func()
+        cache.set(key, value)
+    return value
+
+
+def urls_by_namespace(namespace, urlconf=None, args=None, kwargs=None, prefix=None, current_app=None):
+    """
+    Return a dictionary containing the name together with the URL of all configured
+    URLs specified for this namespace. The result is memoized for each combination of
+    arguments, until the urlconf changes.
+    """
+    if urlconf is None:
+        urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+    args = args or []
+    kwargs = kwargs or {}
+
+    if prefix is None:
+        prefix = get_script_prefix()
+
+    def reverse_all():
+        ns_resolver = _get_namespace_resolver(resolver, namespace, current_app)
+        return dict((name, iri_to_uri(ns_resolver._reverse_with_prefix(name, prefix, *args, **kwargs)))
+                    for name in ns_resolver.reverse_dict.keys() if isinstance(name, basestring))
+
+    key = ('urls', namespace, prefix, tuple(args), tuple(sorted(kwargs.items())), current_app)
+    return dict(_cached(resolver, key, reverse_all))
+
+
+def url_templates_by_namespace(namespace, urlconf=None, prefix=None, current_app=None):
+    """
+    Return a dictionary containing the name together with a URL template of all configured
+    URLs specified for this namespace. Each parameter of a URL pattern is replaced by a
+    placeholder, for instance ``/api/project/:pk/``, as understood by AngularJS's ``$resource``.
+    Unnamed groups are replaced by ``:_0``, ``:_1``, etc. The result is memoized until the
+    urlconf changes.
+    """
+    if urlconf is None:
+        urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+
+    if prefix is None:
+        prefix = get_script_prefix()
+
+    def build_templates():
+        ns_resolver = _get_namespace_resolver(resolver, namespace, current_app)
+        prefix_norm, prefix_args = normalize(urlquote(prefix))[0]
+        templates = {}
+        for name in ns_resolver.reverse_dict.keys():
+            if not isinstance(name, basestring):
+                continue
+            # as in reverse(), the first matching pattern takes precedence
+            possibility = ns_resolver.reverse_dict.getlist(name)[0][0]
+            result, params = possibility[0]
+            placeholders = dict((param, ':%s' % param) for param in prefix_args + params)
+            templates[name] = iri_to_uri((prefix_norm.replace('%', '%%') + result) % placeholders)
+        return templates
+
+    key = ('templates', namespace, prefix, current_app)
+    return dict(_cached(resolver, key, build_templates))
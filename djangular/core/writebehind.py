@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Coalesce frequent updates of the same object into one write. The first writer of an object opens
+a batch and waits for a short delay, during which other writers merge their field values into
+this batch; the value written last wins. Then the first writer flushes the batch once, and all
+writers receive the result of this flush.
+
+Batches are kept in the memory of each process, hence writers in different processes are not
+coalesced with each other. If the flush does not finish within ``DJANGULAR_WRITE_BEHIND_TIMEOUT``
+seconds (default 10), for instance while waiting for a lock, the other writers flush their own
+fields instead.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+_batches = {}
+_batches_lock = threading.Lock()
+
+
+class WriteBatch(object):
+    def __init__(self):
+        self.fields = {}
+        self.writers = 0
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def write_behind(key, fields, flush, delay):
+    """
+    Merge the dictionary ``fields`` into the pending batch of ``key``. If there is none, open it,
+    wait ``delay`` seconds and call ``flush`` with the merged fields. Return a tuple containing
+    the result of ``flush`` and the number of writers coalesced into the batch. Exceptions raised
+    by ``flush`` are raised for all writers.
+    """
+    with _batches_lock:
+        batch = _batches.get(key)
+        leader = batch is None
+        if leader:
+            batch = _batches[key] = WriteBatch()
+        batch.fields.update(fields)
+        batch.writers += 1
+    if not leader:
+        if not batch.done.wait(getattr(settings, 'DJANGULAR_WRITE_BEHIND_TIMEOUT', 10)):
+            # the flush hangs
+            return flush(fields), 1
+        if batch.error is not None:
+            raise batch.error
+        return batch.result, batch.writers
+    try:
+        if delay:
+            time.sleep(delay)
+        with _batches_lock:
+            # later writers open a new batch
+            del _batches[key]
+        batch.result = flush(batch.fields)
+        return batch.result, batch.writers
+    except Exception as err:
+        batch.error = err
+        raise
+    finally:
+        with _batches_lock:
+            if _batches.get(key) is batch:
+                del _batches[key]
+        batch.done.set()
@@ -2,5 +2,8 @@
 from django import VERSION
 from add_placeholder import *
 from angular_model import *
+from angular_formset import *
+from template_cache import *
 if VERSION[0] == 1 and VERSION[1] >= 5:
     from angular_validation import *
+    from validation_schema import *
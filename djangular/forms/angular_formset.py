@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError, NON_FIELD_ERRORS
+from django.forms.models import model_to_dict
+from django.forms.util import ErrorDict, ErrorList
+from django.utils.encoding import force_text
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+__all__ = ['NgModelFormSet']
+
+ROW_INDEX_PLACEHOLDER = '__index__'
+
+
+class NgFormRow(object):
+    """
+    A row of a NgModelFormSet, rendering the markup of each field with the index of this row.
+    """
+    def __init__(self, formset, index):
+        self.formset = formset
+        self.index = index
+
+    def __iter__(self):
+        for name in self.formset.field_templates:
+            yield self[name]
+
+    def __getitem__(self, name):
+        markup = self.formset.field_templates[name]
+        return mark_safe(markup.replace(ROW_INDEX_PLACEHOLDER, str(self.index)))
+
+    def __str__(self):
+        return self.as_table()
+
+    def as_table(self):
+        return format_html('<tr>{0}</tr>', format_html_join('', '<td>{0}</td>', ((field,) for field in self)))
+
+
+class NgModelFormSet(object):
+    """
+    Manage a list of objects, such as the rows of an editable grid, through an Angular controller,
+    using the form class ``form_class``, which must inherit from ``NgModelFormMixin``. The field of
+    each row is bound to the model ``<scope_prefix>.<prefix>[<index>].<field_name>``.
+    Rather than instantiating a form for each row, the markup of each field is rendered once, and
+    the index of the row is substituted into the ``ng-model``, ``name`` and ``id`` attributes.
+    Likewise, a single bound form is used to validate all posted rows one after another.
+    """
+    form_class = None
+    prefix = 'rows'
+    extra = 0
+
+    def __init__(self, data=None, initial=None, instances=None, prefix=None, scope_prefix=None, **form_kwargs):
+        if prefix is not None:
+            self.prefix = prefix
+        if isinstance(data, dict):
+            data = data.get(self.prefix)
+        self.is_bound = data is not None
+        self.data = data or []
+        if not isinstance(self.data, (list, tuple)):
+            raise ValueError('The data of %s must be a list of objects' % self.__class__.__name__)
+        self.initial = initial or []
+        self.instances = list(instances or [])
+        self.scope_prefix = scope_prefix
+        self.form_kwargs = form_kwargs
+        self._errors = None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return self.total_row_count()
+
+    def __str__(self):
+        return self.as_table()
+
+    def total_row_count(self):
+        if self.is_bound:
+            return len(self.data)
+        return max(len(self.initial), len(self.instances)) + self.extra
+
+    @cached_property
+    def template_form(self):
+        """
+        An unbound form, whose fields are rendered with a placeholder for the row index.
+        """
+        prefix = '%s[%s]' % (self.prefix, ROW_INDEX_PLACEHOLDER)
+        return self.form_class(prefix=prefix, scope_prefix=self.scope_prefix, **self.form_kwargs)
+
+    @cached_property
+    def field_templates(self):
+        """
+        An ordered dictionary mapping the field names onto their markup, rendered only once per
+        formset.
+        """
+        form = self.template_form
+        return OrderedDict((name, force_text(form[name])) for name in form.fields)
+
+    @property
+    def rows(self):
+        return [NgFormRow(self, index) for index in range(self.total_row_count())]
+
+    def as_table(self):
+        header = format_html_join('', '<th>{0}</th>', ((field.label,) for field in self.template_form))
+        rows = ''.join(row.as_table() for row in self.rows)
+        return format_html('<tr>{0}</tr>{1}', header, mark_safe(rows))
+
+    def get_initial_data(self):
+        """
+        Return a list containing the initial data of each row, to be injected into the Angular
+        controller, as with ``NgModelFormMixin.get_initial_data``.
+        """
+        fields = self.template_form.fields.keys()
+        data = [model_to_dict(instance, fields) for instance in self.instances]
+        data.extend(self.initial[len(data):])
+        return data
+
+    def add_prefix(self, index, name):
+        return '%s[%d].%s' % (self.prefix, index, name)
+
+    @property
+    def errors(self):
+        """
+        An ErrorDict with the errors of all rows, keyed by the names of their fields, for instance
+        ``rows[3].email``. Errors raised by ``clean`` are keyed by ``__all__``.
+        """
+        if self._errors is None:
+            self.full_clean()
+        return self._errors
+
+    def is_valid(self):
+        return self.is_bound and not self.errors
+
+    def get_bound_form(self):
+        """
+        Return the form, which is rebound to the data of each row during validation.
+        """
+        return self.form_class(data={}, scope_prefix=self.scope_prefix, **self.form_kwargs)
+
+    def bind_form(self, form, index, data):
+        form.data = data
+        form.is_bound = True
+        form._errors = None
+        form._changed_data = None
+        if hasattr(form, 'instance'):
+            # model forms construct a separate instance for each row
+            if index < len(self.instances):
+                form.instance = self.instances[index]
+            else:
+                form.instance = form._meta.model()
+
+    def full_clean(self):
+        """
+        Validate all rows using a single form. The cleaned data of each row is added to
+        ``self.cleaned_data``, the instances of model forms to ``self.cleaned_instances``.
+        """
+        self._errors = ErrorDict()
+        self.cleaned_data = []
+        self.cleaned_instances = []
+        if not self.is_bound:
+            return
+        form = self.get_bound_form()
+        for index, data in enumerate(self.data):
+            if not isinstance(data, dict):
+                raise ValueError('Row %d of %s is not an object' % (index, self.__class__.__name__))
+            self.bind_form(form, index, data)
+            if form.is_valid():
+                self.cleaned_data.append(form.cleaned_data)
+                self.cleaned_instances.append(getattr(form, 'instance', None))
+            else:
+                self.cleaned_data.append(None)
+                self.cleaned_instances.append(None)
+                for name, messages in form.errors.items():
+                    self._errors[self.add_prefix(index, name)] = messages
+        try:
+            self.clean()
+        except ValidationError as err:
+            self._errors[NON_FIELD_ERRORS] = ErrorList(err.messages)
+
+    def clean(self):
+        """
+        Hook for validation across rows, after each row has been cleaned. Raise a ValidationError
+        to add an error to ``__all__``.
+        """
+        pass
+
+    def save(self, commit=True):
+        """
+        Save the instances of all rows, if ``form_class`` is a model form. Returns the instances.
+        """
+        if not self.is_valid():
+            raise ValueError('%s could not be saved, because its data did not validate' % self.__class__.__name__)
+        form = self.get_bound_form()
+        instances = []
+        for instance, cleaned_data in zip(self.cleaned_instances, self.cleaned_data):
+            form.instance, form.cleaned_data, form._errors = instance, cleaned_data, ErrorDict()
+            instances.append(form.save(commit))
+        return instances
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+from django.core.exceptions import ValidationError
+from django.forms.fields import FileField
 from django.forms.util import ErrorDict
+from django.utils.encoding import force_text
 from djangular.forms.angular_base import NgFormBaseMixin
 
 
@@ -53,6 +56,47 @@ class NgModelFormMixin(NgFormBaseMixin):
         if self._errors and self.prefix:
             self._errors = ErrorDict((self.add_prefix(name), value) for name, value in self._errors.items())
 
+    def partial_clean(self, field_names):
+        """
+        Validate only the fields named in ``field_names``, rather than the whole form. Each field
+        runs its validators and its ``clean_<fieldname>`` method, but neither the form's ``clean``
+        method nor the model validation, such as uniqueness checks, is invoked. Fields declared
+        as dependencies in ``Meta.ng_dependencies``, for instance ``{'password2': ['password']}``,
+        are cleaned beforehand, so that their values are available in ``self.cleaned_data``.
+        Return an ErrorDict for the named fields, using the same keys as ``full_clean`` would.
+        """
+        dependencies = getattr(getattr(self, 'Meta', None), 'ng_dependencies', {})
+        names = []
+        for name in field_names:
+            if name not in self.fields:
+                raise ValueError('Form %s has no field named "%s"' % (self.__class__.__name__, name))
+            for dependency in dependencies.get(name, []):
+                if dependency not in names:
+                    names.append(dependency)
+            if name not in names:
+                names.append(name)
+        errors = ErrorDict()
+        if not self.is_bound:
+            return errors
+        self.cleaned_data = {}
+        for name in names:
+            field = self.fields[name]
+            value = field.widget.value_from_datadict(self.data, self.files, self.add_prefix(name))
+            try:
+                if isinstance(field, FileField):
+                    value = field.clean(value, self.initial.get(name, field.initial))
+                else:
+                    value = field.clean(value)
+                self.cleaned_data[name] = value
+                if hasattr(self, 'clean_%s' % name):
+                    self.cleaned_data[name] = getattr(self, 'clean_%s' % name)()
+            except ValidationError as err:
+                self.cleaned_data.pop(name, None)
+                if name in field_names:
+                    key = self.prefix and self.add_prefix(name) or name
+                    errors[key] = self.error_class([force_text(msg) for msg in err.messages])
+        return errors
+
     def get_initial_data(self):
         """
         Return a dictionary specifying the defaults for this form. This dictionary
@@ -45,6 +45,23 @@ class TupleErrorList(forms.util.ErrorList):
             yield isinstance(e, SafeTuple) and force_text(e[1]) or e
 
 
+def get_angular_errors(field):
+    """
+    Add the AngularJS specific validation attributes to the widget of the given field and
+    return a list of tuples containing the Angular error keys and their messages.
+    """
+    patched_form_fields_module = import_module('djangular.forms.patched_fields')
+    # each field type may have different errors and additional AngularJS specific attributes
+    ng_errors_function = '{0}_angular_errors'.format(field.__class__.__name__)
+    try:
+        ng_errors_function = getattr(patched_form_fields_module, ng_errors_function)
+        errors = types.MethodType(ng_errors_function, field)()
+    except (TypeError, AttributeError):
+        ng_errors_function = getattr(patched_form_fields_module, 'Default_angular_errors')
+        errors = types.MethodType(ng_errors_function, field)()
+    return errors
+
+
 class NgFormValidationMixin(NgFormBaseMixin):
     """
     Add this NgFormValidationMixin to every class derived from forms.Form, which shall be
@@ -57,19 +74,11 @@ class NgFormValidationMixin(NgFormBaseMixin):
         super(NgFormValidationMixin, self).__init__(*args, **kwargs)
         if not hasattr(self, '_errors') or self._errors is None:
             self._errors = forms.util.ErrorDict()
-        patched_form_fields_module = import_module('djangular.forms.patched_fields')
         for name, field in self.fields.items():
             # add ng-model to each model field
             identifier = self.add_prefix(name)
             field.widget.attrs.setdefault('ng-model', identifier)
-            # each field type may have different errors and additional AngularJS specific attributes
-            ng_errors_function = '{0}_angular_errors'.format(field.__class__.__name__)
-            try:
-                ng_errors_function = getattr(patched_form_fields_module, ng_errors_function)
-                errors = types.MethodType(ng_errors_function, field)()
-            except (TypeError, AttributeError):
-                ng_errors_function = getattr(patched_form_fields_module, 'Default_angular_errors')
-                errors = types.MethodType(ng_errors_function, field)()
+            errors = get_angular_errors(field)
             field_name = '{0}.{1}'.format(self.form_name, identifier)
             self._errors[name] = KeyErrorList(field_name, errors)
 
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Translate Python regular expressions into their Javascript counterparts, as used by the
+AngularJS directive ``ng-pattern``. Translations are memoized, so that each pattern is converted
+only once per process. Patterns without a Javascript equivalent are reported through the logger
+``djangular`` and yield ``None``, so that validation of such fields is left to the server.
+"""
+import re
+import logging
+from djangular.core.lrucache import LRUCache
+
+logger = logging.getLogger('djangular')
+
+_js_regex_cache = LRUCache(maxsize=256)
+_missing = object()
+
+_escape_translations = {
+    'A': '^',
+    'Z': '$',
+    'a': '\\x07',
+}
+
+_inline_flags_re = re.compile(r'\(\?[iLmsux]+\)')
+_group_name_re = re.compile(r'\(\?P<(\w+)>')
+_group_reference_re = re.compile(r'\(\?P=(\w+)\)')
+
+
+class UntranslatableRegex(ValueError):
+    pass
+
+
+def translate_regex(regex):
+    """
+    Translate a compiled Python regex, or a string containing its pattern, into a tuple
+    containing the Javascript pattern and its flags. Raises ``UntranslatableRegex`` if the
+    pattern uses features not available in Javascript.
+    """
+    if isinstance(regex, basestring):
+        regex = re.compile(regex)
+    pattern, flags = regex.pattern, regex.flags
+    js_flags = ''
+    if flags & re.IGNORECASE:
+        js_flags += 'i'
+    if flags & re.MULTILINE:
+        js_flags += 'm'
+    dotall, verbose = flags & re.DOTALL, flags & re.VERBOSE
+
+    output, group_names = [], {}
+    in_class, class_start, group_count = False, 0, 0
+    pos, length = 0, len(pattern)
+    while pos < length:
+        char = pattern[pos]
+        if char == '\\':
+            if pos + 1 >= length:
+                raise UntranslatableRegex('Pattern ends with a backslash')
+            escaped = pattern[pos + 1]
+            if in_class:
+                output.append(char + escaped)
+            elif escaped in _escape_translations:
+                if escaped in 'AZ' and flags & re.MULTILINE:
+                    raise UntranslatableRegex('\\%s can not be used in multiline mode' % escaped)
+                output.append(_escape_translations[escaped])
+            elif verbose and escaped.isspace():
+                output.append(escaped)
+            else:
+                output.append(char + escaped)
+            pos += 2
+            continue
+        if char == '/':
+            output.append('\\/')
+        elif in_class:
+            if char == ']' and pos > class_start:
+                in_class = False
+                output.append(char)
+            elif char == ']':
+                # a closing bracket at the first position is a literal in Python, but not in JS
+                output.append('\\]')
+            else:
+                output.append(char)
+        elif char == '[':
+            in_class = True
+            class_start = pos + 1
+            if pattern.startswith('^', class_start):
+                class_start += 1
+                output.append('[^')
+                pos += 2
+                continue
+            output.append(char)
+        elif verbose and char.isspace():
+            pass
+        elif verbose and char == '#':
+            end = pattern.find('\n', pos)
+            pos = length if end < 0 else end
+            continue
+        elif char == '.' and dotall:
+            output.append('[\\s\\S]')
+        elif char == '(' and pattern.startswith('(?', pos):
+            match = _inline_flags_re.match(pattern, pos)
+            if match:
+                # inline flags already are part of regex.flags
+                pos = match.end()
+                continue
+            match = _group_name_re.match(pattern, pos)
+            if match:
+                group_count += 1
+                group_names[match.group(1)] = group_count
+                output.append('(')
+                pos = match.end()
+                continue
+            match = _group_reference_re.match(pattern, pos)
+            if match:
+                output.append('(?:\\%d)' % group_names[match.group(1)])
+                pos = match.end()
+                continue
+            if pattern.startswith('(?#', pos):
+                end = pattern.find(')', pos)
+                pos = length if end < 0 else end + 1
+                continue
+            if pattern.startswith(('(?:', '(?=', '(?!'), pos):
+                output.append(pattern[pos:pos + 3])
+                pos += 3
+                continue
+            raise UntranslatableRegex('Unsupported group construct at position %d' % pos)
+        else:
+            if char == '(':
+                group_count += 1
+            output.append(char)
+        pos += 1
+    return ''.join(output), js_flags
+
+
+def js_regex_literal(regex):
+    """
+    Return the Javascript literal, ie. ``/pattern/flags``, for a compiled Python regex, or None
+    if this regex can not be translated.
+    """
+    key = (regex.pattern, regex.flags)
+    literal = _js_regex_cache.get(key, _missing)
+    if literal is not _missing:
+        return literal
+    try:
+        literal = '/%s/%s' % translate_regex(regex)
+    except UntranslatableRegex as err:
+        logger.warning('Regex "%s" can not be translated into Javascript: %s', regex.pattern, err)
+        literal = None
+    _js_regex_cache.set(key, literal)
+    return literal
+
+
+def check_regex_fields(*form_classes):
+    """
+    Translate the patterns of all regex fields declared in the given form classes. Call this
+    during startup, for instance from your ``urls.py``, to get untranslatable patterns reported
+    early. Returns a list of the offending fields as ``(form_class, field_name)`` tuples.
+    """
+    failures = []
+    for form_class in form_classes:
+        for name, field in form_class.base_fields.items():
+            if hasattr(field, 'regex') and js_regex_literal(field.regex) is None:
+                failures.append((form_class, name))
+    return failures
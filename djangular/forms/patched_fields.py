@@ -4,6 +4,7 @@ Class methods to be added to form fields such as django.forms.fields. These meth
 error messages for AngularJS form validation.
 """
 from django.utils.translation import ungettext_lazy
+from djangular.forms.js_regex import js_regex_literal
 
 
 def _input_required(field):
@@ -109,10 +110,11 @@ def SlugField_angular_errors(field):
 
 
 def RegexField_angular_errors(field):
-    # Probably Python Regex can't be translated 1:1 into JS regex. Any hints on how to convert these?
-    field.widget.attrs['ng-pattern'] = '/{0}/'.format(field.regex.pattern)
     errors = _input_required(field)
-    errors += _invalid_value_errors(field, 'pattern')
+    js_pattern = js_regex_literal(field.regex)
+    if js_pattern:
+        field.widget.attrs['ng-pattern'] = js_pattern
+        errors += _invalid_value_errors(field, 'pattern')
     return errors
 
 
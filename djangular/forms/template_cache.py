@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Render registered forms into a JavaScript bundle, which preloads Angular's ``$templateCache``.
+Single page applications then load their forms once, together with this bundle, rather than with
+each page, and route changes need no further request to the server.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.template.loader import render_to_string
+from django.utils.encoding import force_text
+from django.utils.translation import get_language
+
+__all__ = ['register_form_template', 'render_template_cache', 'get_template_cache_bundle']
+
+TEMPLATE_CACHE_MODULE = 'ng.django.forms.templates'
+
+# Registered forms, mapping the keys in $templateCache onto the form class, the keyword arguments
+# used to instantiate it, and the optional name of a Django template rendering it.
+form_templates = OrderedDict()
+
+# Rendered bundles, keyed by language
+_bundles = {}
+
+
+def register_form_template(key, form_class, template_name=None, **form_kwargs):
+    """
+    Add ``form_class`` to the $templateCache bundle, available as ``key``, for instance in the
+    ``templateUrl`` of a route. The form is instantiated using ``form_kwargs``, for instance its
+    ``form_name`` or ``scope_prefix``. It is rendered using ``template_name``, which receives the
+    form in its context as ``form``, or otherwise as table rows.
+    """
+    form_templates[key] = (form_class, template_name, form_kwargs)
+    _bundles.clear()
+
+
+def render_form_template(form_class, template_name, form_kwargs):
+    form = form_class(**form_kwargs)
+    if template_name:
+        return render_to_string(template_name, {'form': form})
+    return force_text(form)
+
+
+def render_template_cache(module_name=TEMPLATE_CACHE_MODULE):
+    """
+    Return the JavaScript code of an Angular module, which puts all registered forms into the
+    $templateCache, rendered in the active language.
+    """
+    lines = [
+        "angular.module('%s', []).run(['$templateCache', function($templateCache) {" % module_name,
+    ]
+    for key, (form_class, template_name, form_kwargs) in form_templates.items():
+        html = render_form_template(form_class, template_name, form_kwargs)
+        lines.append('\t$templateCache.put(%s, %s);' % (json.dumps(key), json.dumps(html)))
+    lines.append('}]);\n')
+    return '\n'.join(lines)
+
+
+def get_template_cache_bundle():
+    """
+    Return a tuple containing the bundle for the active language and its version, a hash of its
+    content. Bundles are rendered once per process and language.
+    """
+    language = get_language()
+    if language not in _bundles:
+        content = render_template_cache()
+        _bundles[language] = (content, hashlib.md5(content.encode('utf-8')).hexdigest()[:12])
+    return _bundles[language]
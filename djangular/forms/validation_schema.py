@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Serialize the validation rules of a Django form class into a compact structure, which can be
+shipped as JSON to an AngularJS application. This allows the client to build and validate its
+forms, without having to render the form's HTML on the server for each page view.
+"""
+import copy
+from django.utils.encoding import force_text
+from djangular.forms.angular_validation import get_angular_errors
+
+# widget attributes added by the patched fields, mapped onto the keys used in the schema
+SCHEMA_ATTRIBUTES = (
+    ('ng-required', 'required'),
+    ('ng-minlength', 'minlength'),
+    ('ng-maxlength', 'maxlength'),
+    ('min', 'min'),
+    ('max', 'max'),
+    ('ng-pattern', 'pattern'),
+)
+
+
+def field_validation_rules(field):
+    """
+    Return a dictionary containing the validation rules and error messages of a form field.
+    The field itself is left untouched.
+    """
+    field = copy.deepcopy(field)
+    field.widget.attrs = {}
+    errors = get_angular_errors(field)
+    rules = {
+        'type': getattr(field.widget, 'input_type', None) or 'text',
+        'label': field.label and force_text(field.label) or None,
+    }
+    for attr, key in SCHEMA_ATTRIBUTES:
+        if attr in field.widget.attrs:
+            rules[key] = field.widget.attrs[attr]
+    rules['required'] = rules.get('required') == 'true'
+    rules['errors'] = dict((key, force_text(msg)) for key, msg in errors)
+    return rules
+
+
+def form_validation_schema(form_class):
+    """
+    Return the validation schema of a form class. Fields are listed in their declaration order.
+    Error messages are translated into the currently active language.
+    """
+    fields = []
+    for name, field in form_class.base_fields.items():
+        rules = field_validation_rules(field)
+        rules['name'] = name
+        fields.append(rules)
+    return {'form': form_class.__name__, 'fields': fields}
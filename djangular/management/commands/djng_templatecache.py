@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Render the forms registered with ``register_form_template`` into the versioned bundle, which
+preloads Angular's ``$templateCache``, so that it can be deployed together with the static files::
+
+    ./manage.py djng_templatecache --language=en --language=de
+"""
+import os
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import get_resolver
+from django.utils import translation
+
+from djangular.forms.template_cache import get_template_cache_bundle
+
+
+class Command(BaseCommand):
+    help = "Render the registered forms into bundles preloading Angular's $templateCache."
+    option_list = BaseCommand.option_list + (
+        make_option('--output', default=None,
+            help='Directory the bundles are written to, defaults to STATIC_ROOT/djangular.'),
+        make_option('--language', action='append', dest='languages', default=[],
+            help='Render the bundle for this language. May be given more than once.'),
+    )
+
+    def handle(self, *args, **options):
+        # import the urlconf, which registers forms, as it happens on the first request
+        get_resolver(None).url_patterns
+        output = options['output'] or os.path.join(settings.STATIC_ROOT, 'djangular')
+        if not os.path.isdir(output):
+            os.makedirs(output)
+        for language in options['languages'] or [settings.LANGUAGE_CODE]:
+            translation.activate(language)
+            try:
+                content, version = get_template_cache_bundle()
+            finally:
+                translation.deactivate()
+            filename = os.path.join(output, 'templates.%s.js' % version)
+            with open(filename, 'wb') as fh:
+                fh.write(content.encode('utf-8'))
+            self.stdout.write('Bundle for language %s written to %s' % (language, filename))
@@ -1 +1,9 @@
 # Django needs this to see it as a project
+from django.conf import settings
+from djangular.views.action_cache import connect_action_cache_signals
+
+connect_action_cache_signals()
+
+if 'django.contrib.auth' in settings.INSTALLED_APPS:
+    from djangular.views.auth import connect_user_cache_signals
+    connect_user_cache_signals()
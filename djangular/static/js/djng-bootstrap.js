@@ -0,0 +1,39 @@
+/*
+ * django-angular-bootstrap
+ * https://github.com/jrief/django-angular
+ *
+ * Read the initial data embedded into the page by the template tag {% djng_bootstrap %}.
+ *
+ * Copyright (c) 2014 Jacob Rief
+ * Licensed under the MIT license.
+ */
+
+(function(angular, undefined) {
+'use strict';
+
+angular.module('ng.django.bootstrap', []).factory('djangoBootstrap', ['$document', '$log', function($document, $log) {
+	var data = {}, element = $document[0].getElementById('djng-bootstrap');
+
+	if (element) {
+		try {
+			data = angular.fromJson(element.textContent || element.innerText) || {};
+		} catch (e) {
+			$log.warn('The data embedded into the page is invalid JSON');
+		}
+	}
+
+	return {
+		// return the embedded payload, for instance 'user', 'urls' or the name of a list
+		get: function(key) {
+			return data[key];
+		},
+		// return the embedded payload only once, so that later callers fetch it from the server
+		take: function(key) {
+			var value = data[key];
+			delete data[key];
+			return value;
+		}
+	};
+}]);
+
+})(window.angular);
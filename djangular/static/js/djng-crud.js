@@ -0,0 +1,95 @@
+/*
+ * django-angular-crud
+ * https://github.com/jrief/django-angular
+ *
+ * Transformers for the responses of djangular's NgCRUDView.
+ *
+ * Copyright (c) 2014 Jacob Rief
+ * Licensed under the MIT license.
+ */
+
+(function(angular, undefined) {
+'use strict';
+
+angular.module('ng.django.crud', []).factory('djangoColumns', ['$http', function($http) {
+	// Expand a list sent in the columnar format {columns: [...], rows: [[...], ...]} into
+	// an array of objects. Anything else is returned unchanged.
+	function expand(data) {
+		var objects = [], columns, row, obj, i, j;
+		if (!angular.isObject(data) || !angular.isArray(data.columns) || !angular.isArray(data.rows))
+			return data;
+		columns = data.columns;
+		for (i = 0; i < data.rows.length; i++) {
+			row = data.rows[i];
+			obj = {};
+			for (j = 0; j < columns.length; j++) {
+				obj[columns[j]] = row[j];
+			}
+			objects.push(obj);
+		}
+		return objects;
+	}
+
+	return {
+		expand: expand,
+		// use as 'transformResponse' of a $resource action
+		transformResponse: $http.defaults.transformResponse.concat([expand]),
+		// parameters to request the columnar format from NgCRUDView
+		params: {format: 'columns'}
+	};
+}]).factory('djangoMsgpack', ['$window', function($window) {
+	// Encode and decode MessagePack, for views with 'msgpack = True'. Requires a MessagePack
+	// library exposing 'msgpack.encode' and 'msgpack.decode', such as msgpack-lite.
+	var contentType = 'application/x-msgpack';
+
+	function codec() {
+		if (!$window.msgpack)
+			throw new Error('djangoMsgpack requires a MessagePack library, such as msgpack-lite');
+		return $window.msgpack;
+	}
+
+	// Decode UTF-8 in chunks, since passing a large buffer to String.fromCharCode.apply exceeds
+	// the maximum number of arguments.
+	function decodeUTF8(bytes) {
+		var chunks = [], size = 8192, i;
+		for (i = 0; i < bytes.length; i += size) {
+			chunks.push(String.fromCharCode.apply(null, bytes.subarray(i, i + size)));
+		}
+		return decodeURIComponent(escape(chunks.join('')));
+	}
+
+	function transformResponse(data, headersGetter) {
+		var type = headersGetter('Content-Type') || '';
+		if (type.indexOf(contentType) === 0 && data)
+			return codec().decode(new Uint8Array(data));
+		if (data instanceof ArrayBuffer) {
+			// the server answered with JSON, for instance on errors
+			data = decodeUTF8(new Uint8Array(data));
+			return data ? angular.fromJson(data) : data;
+		}
+		return data;
+	}
+
+	function transformRequest(data, headersGetter) {
+		if (data === undefined)
+			return data;
+		headersGetter()['Content-Type'] = contentType;
+		return codec().encode(data);
+	}
+
+	return {
+		transformResponse: transformResponse,
+		transformRequest: transformRequest,
+		// options to add to a $resource action
+		action: function(options) {
+			return angular.extend({
+				headers: {'Accept': contentType},
+				responseType: 'arraybuffer',
+				transformResponse: transformResponse,
+				transformRequest: transformRequest
+			}, options);
+		}
+	};
+}]);
+
+})(window.angular);
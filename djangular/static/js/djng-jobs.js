@@ -0,0 +1,67 @@
+/*
+ * django-angular-jobs
+ * https://github.com/jrief/django-angular
+ *
+ * Wait for background jobs, submitted by actions decorated with @allowed_action(background=True).
+ *
+ * Copyright (c) 2014 Jacob Rief
+ * Licensed under the MIT license.
+ */
+
+(function(angular, undefined) {
+'use strict';
+
+angular.module('ng.django.jobs', []).factory('djangoJob', ['$http', '$q', '$timeout', function($http, $q, $timeout) {
+	var waiting = {}, maxDelay = 10000;
+
+	// Resolve or reject the promise of a finished job. Returns false, if the job is still running.
+	function settle(state) {
+		var deferred = state && waiting[state.job];
+		if (!deferred)
+			return false;
+		if (state.status === 'done') {
+			deferred.resolve(state.result);
+		} else if (state.status === 'failed') {
+			deferred.reject(state.error);
+		} else {
+			return false;
+		}
+		delete waiting[state.job];
+		return true;
+	}
+
+	function poll(url, job, delay) {
+		$timeout(function() {
+			if (!waiting[job])
+				return;
+			$http.get(url).then(function(response) {
+				if (!settle(response.data)) {
+					poll(url, job, Math.min(delay * 2, maxDelay));
+				}
+			}, function(response) {
+				if (waiting[job]) {
+					waiting[job].reject(response.data);
+					delete waiting[job];
+				}
+			});
+		}, delay);
+	}
+
+	return {
+		// Return a promise for the result of the job, as answered with status 202. Its state is
+		// polled with an increasing delay, unless it is delivered earlier through 'notify'.
+		wait: function(job, delay) {
+			var deferred = waiting[job.job] = waiting[job.job] || $q.defer();
+			if (job.url) {
+				poll(job.url, job.job, delay || 500);
+			}
+			return deferred.promise;
+		},
+		// Pass the states of jobs pushed through the websocket. Returns true, if the job was awaited.
+		notify: function(state) {
+			return settle(state);
+		}
+	};
+}]);
+
+})(window.angular);
@@ -14,6 +14,9 @@
 angular.module('ng.django.websocket', []).provider('djangoWebsocket', function() {
 	var _prefix;
 	var _console = { log: noop, warn: noop, error: noop };
+	var _reconnect = { base: 1000, max: 60000 };
+	var _heartbeat = { message: '--heartbeat--', interval: 0 };
+	var _resumeUrl = null;
 
 	function noop() {}
 
@@ -29,8 +32,31 @@ angular.module('ng.django.websocket', []).provider('djangoWebsocket', function()
 		return this;
 	};
 
-	this.$get = ['$window', '$q', '$timeout', function($window, $q, $timeout) {
-		var ws, deferred, timer = null, interval = null, scope, channels, collection;
+	// After a disconnect, wait a random delay between 0 and base * 2^attempts milliseconds,
+	// but at most max milliseconds, so that clients do not reconnect all at the same time.
+	this.reconnect = function(base, max) {
+		_reconnect = { base: base, max: max };
+		return this;
+	};
+
+	// Send the heartbeat message every interval milliseconds. If the server did not send anything
+	// during two intervals, the connection is regarded as dead and reopened.
+	this.heartbeat = function(message, interval) {
+		_heartbeat = { message: message, interval: interval };
+		return this;
+	};
+
+	// URL of djangular's NgUpdatesView for the facility, used to fetch the updates, which were
+	// published while the connection was down.
+	this.resume = function(url) {
+		_resumeUrl = url;
+		return this;
+	};
+
+	this.$get = ['$window', '$q', '$timeout', '$interval', '$http', function($window, $q, $timeout, $interval, $http) {
+		var ws, deferred, timer = null, attempts = 0, heartbeat = null, missed = 0, opened = false, lastSeq = null;
+		var resuming = false, droppedSeq = null;
+		var scope, channels, collection;
 
 		function connect(uri) {
 			try {
@@ -49,17 +75,27 @@ angular.module('ng.django.websocket', []).provider('djangoWebsocket', function()
 
 		function on_open(evt) {
 			_console.log('Connected');
-			interval = 3000;
+			attempts = 0;
+			start_heartbeat();
+			if (opened) {
+				resume();
+			}
+			opened = true;
 			deferred.resolve();
 		}
 
 		function on_close(evt) {
+			var delay;
 			_console.log("Connection closed");
-			if (!timer && interval) {
+			stop_heartbeat();
+			if (!timer) {
+				delay = Math.min(_reconnect.base * Math.pow(2, attempts), _reconnect.max);
+				delay = Math.round(Math.random() * delay);
+				attempts++;
+				_console.log("Reconnecting in " + delay + "ms");
 				timer = $timeout(function() {
 					connect(ws.url);
-				}, interval);
-				interval = Math.min(interval + 1000, 90000);
+				}, delay);
 			}
 		}
 
@@ -69,13 +105,103 @@ angular.module('ng.django.websocket', []).provider('djangoWebsocket', function()
 		}
 
 		function on_message(evt) {
+			var server_data, lost = false;
+			missed = 0;
+			if (evt.data === _heartbeat.message)
+				return;
 			try {
-				var server_data = JSON.parse(evt.data);
-				scope.$apply(function() {
-					angular.extend(scope[collection], server_data);
-				});
+				server_data = JSON.parse(evt.data);
 			} catch(e) {
 				_console.warn('Data received by server is invalid JSON: ' + evt.data);
+				return;
+			}
+			if (is_update(server_data)) {
+				if (lastSeq !== null && server_data.seq <= lastSeq)
+					return;
+				if (lastSeq !== null && server_data.seq > lastSeq + 1) {
+					if (_resumeUrl) {
+						// some updates were lost, fetch them in order, including this one
+						droppedSeq = Math.max(droppedSeq || 0, server_data.seq);
+						resume();
+						return;
+					}
+					_console.warn('Updates were lost and can not be resumed');
+					lost = true;
+				}
+				lastSeq = server_data.seq;
+				server_data = server_data.data;
+			}
+			scope.$apply(function() {
+				angular.extend(scope[collection], server_data);
+				if (lost) {
+					scope.$broadcast('djangoWebsocket.reset', collection);
+				}
+			});
+		}
+
+		// updates published by djangular.core.updates are numbered
+		function is_update(data) {
+			return angular.isObject(data) && angular.isNumber(data.seq) && angular.isObject(data.data);
+		}
+
+		function reset(seq) {
+			lastSeq = seq;
+			droppedSeq = null;
+			scope.$broadcast('djangoWebsocket.reset', collection);
+		}
+
+		// Fetch the updates published after lastSeq. Only one request is sent at a time; updates
+		// dropped meanwhile are fetched by another request, if the first did not contain them.
+		function resume() {
+			if (!_resumeUrl || lastSeq === null || resuming)
+				return;
+			resuming = true;
+			$http.get(_resumeUrl, { params: { since: lastSeq } }).success(function(data) {
+				resuming = false;
+				if (data.reset) {
+					_console.warn('Missed updates are not available anymore');
+					reset(data.seq);
+					return;
+				}
+				angular.forEach(data.updates, function(update) {
+					if (update.seq > lastSeq) {
+						angular.extend(scope[collection], update.data);
+						lastSeq = update.seq;
+					}
+				});
+				if (droppedSeq !== null && droppedSeq > lastSeq) {
+					resume();
+				} else {
+					droppedSeq = null;
+				}
+			}).error(function(data, status) {
+				resuming = false;
+				_console.error('Missed updates could not be fetched, status ' + status);
+				// accept the next update as it comes, the controller shall reload its data
+				reset(null);
+			});
+		}
+
+		function start_heartbeat() {
+			if (!_heartbeat.interval)
+				return;
+			missed = 0;
+			heartbeat = $interval(function() {
+				if (missed++ >= 2) {
+					_console.warn('Heartbeat missed, reconnecting');
+					ws.onclose = ws.onmessage = ws.onerror = null;
+					ws.close();
+					on_close();
+					return;
+				}
+				ws.send(_heartbeat.message);
+			}, _heartbeat.interval, 0, false);
+		}
+
+		function stop_heartbeat() {
+			if (heartbeat) {
+				$interval.cancel(heartbeat);
+				heartbeat = null;
 			}
 		}
 
@@ -91,7 +217,7 @@ angular.module('ng.django.websocket', []).provider('djangoWebsocket', function()
 				scope = scope_;
 				channels = channels_;
 				collection = collection_;
-				parts.push(location.protocol === 'https' ? 'wss:' : 'ws:');
+				parts.push(location.protocol === 'https:' ? 'wss:' : 'ws:');
 				parts.push('//');
 				parts.push(location.host);
 				parts.push(_prefix);
@@ -104,6 +230,14 @@ angular.module('ng.django.websocket', []).provider('djangoWebsocket', function()
 					scope.$watchCollection(collection, listener);
 				});
 				return deferred.promise;
+			},
+			// the sequence number of the last update received, for instance to be stored
+			// together with data loaded by other means
+			lastSeq: function(seq) {
+				if (seq !== undefined) {
+					lastSeq = seq;
+				}
+				return lastSeq;
 			}
 		};
 	}];
@@ -1,11 +1,31 @@
 # -*- coding: utf-8 -*-
-from django.template import Library
-from django.template.base import Node
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template import Library, TemplateSyntaxError
+from django.template.base import Node, token_kwargs
 from django.core.exceptions import ImproperlyConfigured
+from django.utils import six
+from django.utils.module_loading import import_by_path
 from django.utils.safestring import mark_safe
 
 register = Library()
 
+# characters which must not appear literally inside a <script> element
+_script_escapes = {
+    ord('<'): u'\\u003c',
+    ord('>'): u'\\u003e',
+    ord('&'): u'\\u0026',
+    0x2028: u'\\u2028',
+    0x2029: u'\\u2029',
+}
+
+
+def json_for_script(data):
+    """
+    Encode ``data`` as JSON, which can safely be embedded into a <script> element.
+    """
+    return six.text_type(json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)).translate(_script_escapes)
+
 
 class CsrfValueNode(Node):
     def render(self, context):
@@ -21,3 +41,109 @@ class CsrfValueNode(Node):
 @register.tag(name='csrf_value')
 def render_csrf_value(parser, token):
     return CsrfValueNode()
+
+
+class BootstrapNode(Node):
+    element_id = 'djng-bootstrap'
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    def get_user(self, request, view_class, fields=None, relations=None):
+        from djangular.views.auth import NgLoggedInUserView
+
+        if isinstance(view_class, six.string_types):
+            view_class = import_by_path(view_class)
+        elif not isinstance(view_class, type):
+            view_class = NgLoggedInUserView
+        view = view_class()
+        view.request = request
+        if fields is None:
+            fields = view.bootstrap_fields
+        elif isinstance(fields, six.string_types):
+            fields = fields.split(',')
+        # never use the relations and fields of the page's query string
+        return json.loads(view.get_payload(relations or '', list(fields)))
+
+    def render(self, context):
+        from djangular.core.urlresolvers import urls_by_namespace
+
+        request = context.get('request', None)
+        if request is None:
+            raise ImproperlyConfigured('Template must be rendered using a RequestContext, '
+                                       'including the request context processor')
+        payloads = dict((key, expression.resolve(context)) for key, expression in self.payloads.items())
+        user_fields = payloads.pop('user_fields', None)
+        user_relations = payloads.pop('user_relations', None)
+        data = {}
+        for key, value in sorted(payloads.items()):
+            if key == 'user':
+                if value:
+                    data['user'] = self.get_user(request, value, user_fields, user_relations)
+            elif key == 'urls':
+                data['urls'] = urls_by_namespace(value)
+            else:
+                view_class = import_by_path(value) if isinstance(value, six.string_types) else value
+                objects = view_class.get_bootstrap_data(request)
+                if objects is not None:
+                    data[key] = objects
+        return mark_safe('<script type="application/json" id="%s">%s</script>' %
+                         (self.element_id, json_for_script(data)))
+
+
+@register.tag(name='djng_bootstrap')
+def render_bootstrap(parser, token):
+    """
+    Embed the payloads, which an Angular application otherwise fetches right after startup,
+    into the page. Use it as::
+
+        {% djng_bootstrap user=True urls='api' projects='myapp.views.ProjectCRUDView' %}
+
+    ``user`` adds the logged in user, as returned by ``NgLoggedInUserView``, or by the view
+    class given instead of True, restricted to the ``bootstrap_fields`` of this view, or to the
+    comma separated ``user_fields``. ``user_relations`` adds relations, encoded as JSON.
+    ``urls`` adds the URLs of the given namespace. Each other keyword adds the objects of the
+    given ``NgCRUDView``, as returned by its ``query()``, unless this view denies the request.
+    The Angular module ``ng.django.bootstrap`` reads them.
+    """
+    bits = token.split_contents()[1:]
+    payloads = token_kwargs(bits, parser)
+    if bits or not payloads:
+        raise TemplateSyntaxError("'djng_bootstrap' expects keyword arguments, such as user=True")
+    return BootstrapNode(payloads)
+
+
+class TemplateCacheNode(Node):
+    def __init__(self, options):
+        self.options = options
+
+    def render(self, context):
+        from django.conf import settings
+        from django.core.urlresolvers import reverse
+        from djangular.forms.template_cache import get_template_cache_bundle
+
+        options = dict((key, expression.resolve(context)) for key, expression in self.options.items())
+        version = get_template_cache_bundle()[1]
+        if options.get('static'):
+            src = '%sdjangular/templates.%s.js' % (settings.STATIC_URL, version)
+        else:
+            src = reverse(options.get('url_name', 'ng_template_cache'), kwargs={'version': version})
+        return mark_safe('<script src="%s"></script>' % src)
+
+
+@register.tag(name='djng_template_cache')
+def render_template_cache(parser, token):
+    """
+    Load the bundle of forms preloading Angular's $templateCache. By default it is served by
+    ``NgTemplateCacheView`` through the URL named 'ng_template_cache'; use ``url_name`` if this
+    view is included under another name. Use ``static=True`` to load the bundle built by the
+    management command ``djng_templatecache`` from the static files instead::
+
+        {% djng_template_cache %}
+        {% djng_template_cache static=True %}
+    """
+    bits = token.split_contents()[1:]
+    options = token_kwargs(bits, parser)
+    if bits:
+        raise TemplateSyntaxError("'djng_template_cache' accepts the keyword arguments url_name and static")
+    return TemplateCacheNode(options)
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for testing views built with djangular.
+"""
+import json
+from django.test.client import RequestFactory
+
+
+class CRUDQueriesMixin(object):
+    """
+    Add this mixin to a ``django.test.TestCase`` to assert the number of SQL queries, which an
+    ``NgCRUDView`` executes for a given relations definition. This catches N+1 regressions in the
+    serialization of relations, before they reach production.
+    """
+    def assertRelationsNumQueries(self, num, view_class, relations, extras=None, pk=None, **kwargs):
+        """
+        Query ``view_class`` using the given relations and extras, and assert that this executes
+        exactly ``num`` queries. If ``pk`` is given, a single object is fetched. Returns the
+        response.
+        """
+        params = {'relations': json.dumps(relations)}
+        if extras:
+            params['extras'] = ','.join(extras)
+        request = RequestFactory().get('/', params)
+        if pk is not None:
+            kwargs['pk'] = pk
+        with self.assertNumQueries(num):
+            response = view_class.as_view()(request, **kwargs)
+        return response
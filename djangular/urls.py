@@ -4,6 +4,12 @@ from django.conf import settings
 from django.views.generic import TemplateView
 
 from views.auth import NgLoggedInUserView
+from views.jobs import NgJobStatusView
+from views.templatecache import NgTemplateCacheView
+from views.updates import NgUpdatesView
 urlpatterns = patterns('',
     url(r"^logged-in-user/$", NgLoggedInUserView.as_view(), {'action': 'get_data'}, name="ng_logged_in_user_view"),
+    url(r"^templates/(?P<version>\w+)\.js$", NgTemplateCacheView.as_view(), name="ng_template_cache"),
+    url(r"^jobs/(?P<job_id>[0-9a-f]{32})/$", NgJobStatusView.as_view(), name="ng_job_status"),
+    url(r"^updates/(?P<facility>[\w-]+)/$", NgUpdatesView.as_view(), name="ng_updates"),
 )
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Caching of the encoded results of actions, which are invoked through ``JSONResponseMixin``.
+Enable it for pure lookups by passing a ``cache_timeout`` to ``@allowed_action``. Cached results
+are served without calling the action and without encoding its result again.
+
+The cache key is built from the view class, the action, the keyword arguments of the URL and the
+payload of the request, or only those keys of the payload named in ``cache_key``. Optionally it
+varies on the logged in user and on the active language. Results are invalidated by tags: a tag
+is either a string, invalidated by calling ``invalidate_cached_actions``, or a model class,
+invalidated whenever an instance of this model is saved or deleted.
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils.translation import get_language
+
+from djangular.views.encoding import accepts_msgpack
+
+ACTION_TAG_VERSION_KEY = 'djangular:action-tag:%s'
+
+# Models used as tags of cached actions, mapped onto their tag
+tagged_models = {}
+
+
+def get_tag(tag):
+    if isinstance(tag, basestring):
+        return tag
+    opts = tag._meta
+    tagged_models[tag] = '%s.%s' % (opts.app_label, opts.object_name.lower())
+    return tagged_models[tag]
+
+
+def _get_tag_version(tag):
+    key = ACTION_TAG_VERSION_KEY % tag
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_cached_actions(*tags):
+    """
+    Invalidate the cached results of all actions tagged with one of ``tags``.
+    """
+    cache.set_many(dict((ACTION_TAG_VERSION_KEY % get_tag(tag), uuid.uuid4().hex) for tag in tags), None)
+
+
+class ActionCache(object):
+    """
+    The caching options of an action, as passed to ``@allowed_action``.
+    """
+    def __init__(self, timeout, key=None, vary_on_user=False, vary_on_language=False, tags=()):
+        self.timeout = timeout
+        self.key = key
+        self.vary_on_user = vary_on_user
+        self.vary_on_language = vary_on_language
+        self.tags = [get_tag(tag) for tag in tags]
+
+    def get_cache_key(self, view, request, action, in_data):
+        if self.key is not None:
+            in_data = dict((name, in_data.get(name)) for name in self.key)
+        signature = [
+            '%s.%s' % (view.__class__.__module__, view.__class__.__name__),
+            action.__name__,
+            getattr(view, 'kwargs', {}),
+            in_data,
+            accepts_msgpack(view, request),
+        ]
+        if self.vary_on_user:
+            user = getattr(request, 'user', None)
+            signature.append(user.pk if user is not None and user.is_authenticated() else None)
+        if self.vary_on_language:
+            signature.append(get_language())
+        signature.append([_get_tag_version(tag) for tag in self.tags])
+        signature = json.dumps(signature, cls=DjangoJSONEncoder, sort_keys=True)
+        return 'djangular:action:%s' % hashlib.md5(signature.encode('utf-8')).hexdigest()
+
+
+def _tagged_model_changed(sender, **kwargs):
+    if sender in tagged_models:
+        invalidate_cached_actions(sender)
+
+
+def _tagged_relations_changed(sender, instance, action, model, **kwargs):
+    if action.startswith('post_'):
+        models = [model for model in (instance.__class__, model) if model in tagged_models]
+        if models:
+            invalidate_cached_actions(*models)
+
+
+def connect_action_cache_signals():
+    """
+    Connect the signals invalidating the cached results of actions tagged with a model.
+    """
+    post_save.connect(_tagged_model_changed, dispatch_uid='djangular_action_cache_saved')
+    post_delete.connect(_tagged_model_changed, dispatch_uid='djangular_action_cache_deleted')
+    m2m_changed.connect(_tagged_relations_changed, dispatch_uid='djangular_action_cache_relations_changed')
@@ -1,30 +1,152 @@
 # -*- coding: utf-8 -*-
 import json
+import hashlib
+import uuid
 
 from django.core import serializers
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.auth.models import Group, Permission
 from django.forms.models import modelform_factory
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag, parse_etags
 from django.views.generic import FormView, View
 from django.conf import settings
 from django.db.models import ForeignKey, DateTimeField
+from django.db.models.signals import post_save, post_delete, m2m_changed
 
 import dateutil.parser as dateparser
 
-from mixins import JSONResponseMixin, allowed_action
+from mixins import JSONResponseMixin, allowed_action, fetch_relations
+
+USER_VERSION_KEY = 'djangular:user-version:%s'
+USER_GENERATION_KEY = 'djangular:user-generation'
+
+# Models serialized together with the logged in user, such as profiles, mapped onto the name
+# of their field pointing to the user. Add entries using register_user_related_model().
+user_related_models = {}
+
+
+def register_user_related_model(model, user_field='user'):
+    """
+    Invalidate the cached payload of the logged in user, whenever an instance of ``model``
+    pointing to this user through ``user_field`` is saved or deleted.
+    """
+    user_related_models[model] = user_field
+
+
+def invalidate_logged_in_user(user_pk=None):
+    """
+    Invalidate the cached payloads of the user with the given primary key, or of all users.
+    """
+    if user_pk is None:
+        cache.set(USER_GENERATION_KEY, uuid.uuid4().hex, None)
+    else:
+        cache.set(USER_VERSION_KEY % user_pk, uuid.uuid4().hex, None)
+
+
+def _is_user_model(model):
+    opts = model._meta
+    return '%s.%s' % (opts.app_label, opts.object_name) == getattr(settings, 'AUTH_USER_MODEL', 'auth.User')
+
+
+def _user_saved_or_deleted(sender, instance, **kwargs):
+    if _is_user_model(sender):
+        invalidate_logged_in_user(instance.pk)
+    elif sender in user_related_models:
+        field = sender._meta.get_field(user_related_models[sender])
+        invalidate_logged_in_user(getattr(instance, field.attname))
+    elif sender in (Group, Permission):
+        invalidate_logged_in_user()
+
+
+def _user_relations_changed(sender, instance, action, model, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if _is_user_model(instance.__class__):
+        invalidate_logged_in_user(instance.pk)
+    elif _is_user_model(model) and pk_set:
+        for pk in pk_set:
+            invalidate_logged_in_user(pk)
+    elif _is_user_model(model) or isinstance(instance, (Group, Permission)):
+        invalidate_logged_in_user()
+    elif instance.__class__ in user_related_models:
+        _user_saved_or_deleted(instance.__class__, instance)
+
+
+def connect_user_cache_signals():
+    """
+    Connect the signals invalidating the cached payloads of NgLoggedInUserView.
+    """
+    post_save.connect(_user_saved_or_deleted, dispatch_uid='djangular_user_saved')
+    post_delete.connect(_user_saved_or_deleted, dispatch_uid='djangular_user_deleted')
+    m2m_changed.connect(_user_relations_changed, dispatch_uid='djangular_user_relations_changed')
+
 
 class NgLoggedInUserView(JSONResponseMixin, View):
+    """
+    Return the logged in user. The payload is cached for each user and each combination of the
+    ``relations`` and ``fields`` requested by the client, until the user or one of its related
+    objects changes. Responses carry an ETag, so that repeated requests are answered with 304.
+    If ``concurrent_relations`` is set, multi valued relations are fetched concurrently.
+    """
+    cache_timeout = 300
+    concurrent_relations = False
+    # fields of the user embedded by the template tag djng_bootstrap
+    bootstrap_fields = ('username', 'first_name', 'last_name', 'email', 'is_staff', 'is_superuser')
 
-    @allowed_action
-    def get_data(self):
-        # Returns the logged in user
+    def _get_version(self, key):
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        return version
+
+    def get_payload(self, relations=None, fields=None):
+        """
+        Return the JSON encoded payload of the logged in user. Unless given, the ``relations``,
+        encoded as JSON, and the ``fields`` are those requested by the client.
+        """
         user = self.request.user if self.request.user.is_authenticated() else None
-        if user:
-            # Define the relations / fields you want returned, in your AngularJS app
+        if not user:
+            return '{}'
+        # Define the relations / fields you want returned, in your AngularJS app
+        if relations is None:
             relations = self.request.GET.get('relations', None)
+        if fields is None:
             fields = self.request.GET.getlist('fields', [])
+        signature = hashlib.md5(json.dumps([relations, sorted(fields)])).hexdigest()
+        key = 'djangular:logged-in-user:%s:%s:%s:%s' % (user.pk, self._get_version(USER_VERSION_KEY % user.pk),
+                                                       self._get_version(USER_GENERATION_KEY), signature)
+        content = cache.get(key)
+        if content is None:
+            queryset = user.__class__._default_manager.filter(pk=user.pk)
+            user = fetch_relations(queryset, relations and json.loads(relations), self.concurrent_relations)[0]
             data = self.build_model_dict(user, relations, fields)[0]
-            return data
+            content = json.dumps(data, cls=DjangoJSONEncoder)
+            cache.set(key, content, self.cache_timeout)
+        return content
+
+    @allowed_action
+    def get_data(self):
+        # Returns the logged in user
+        return json.loads(self.get_payload())
+
+    def get(self, request, *args, **kwargs):
+        if kwargs.get('action') != 'get_data':
+            return super(NgLoggedInUserView, self).get(request, *args, **kwargs)
+        try:
+            content = self.get_payload()
+        except ValueError as err:
+            return HttpResponseBadRequest(err)
+        etag = hashlib.md5(content).hexdigest()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
         else:
-            return {}
+            response = HttpResponse(content, content_type='application/json;charset=UTF-8')
+        response['ETag'] = quote_etag(etag)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Optional compression of the responses created by djangular's views, for deployments where the
+fronting proxy does not compress them. Gzip is always available, Brotli is used if the package
+``brotli`` is installed and the client accepts it.
+
+Enable it for all views with ``DJANGULAR_COMPRESSION = True`` in the settings, or for a single
+view by setting its class attribute ``compress = True``. Responses smaller than
+``compress_min_length`` bytes are sent uncompressed. ``compress_level`` (1-9, for gzip) and
+``brotli_quality`` (0-11) trade CPU time against bandwidth.
+"""
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'application/javascript', 'application/x-msgpack')
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def accepted_encodings(request):
+    """
+    Return the set of content codings the client accepts, according to its Accept-Encoding
+    header. Codings with a quality of zero are excluded.
+    """
+    encodings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        match = _accept_encoding_re.match(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if quality > 0:
+            encodings.add(match.group(1).lower())
+    return encodings
+
+
+def negotiate_encoding(request):
+    encodings = accepted_encodings(request)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings or '*' in encodings:
+        return 'gzip'
+    return None
+
+
+class GzipCompressor(object):
+    def __init__(self, level):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressobj.compress(data)
+
+    def flush(self):
+        return self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressobj.flush()
+
+
+class BrotliCompressor(object):
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def get_compressor(encoding, view):
+    if encoding == 'br':
+        return BrotliCompressor(getattr(view, 'brotli_quality', 5))
+    return GzipCompressor(getattr(view, 'compress_level', 6))
+
+
+def compress_sequence(sequence, compressor):
+    """
+    Compress an iterable of byte strings, flushing the compressor after each item, so that the
+    client receives the data as soon as it is produced.
+    """
+    for item in sequence:
+        data = compressor.compress(item)
+        data += compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def is_compressed(view):
+    compress = getattr(view, 'compress', None)
+    if compress is None:
+        return getattr(settings, 'DJANGULAR_COMPRESSION', False)
+    return compress
+
+
+def compress_response(view, request, response):
+    """
+    Compress the response, if enabled for this view and accepted by the client.
+    """
+    if not is_compressed(view) or response.status_code != 200 or response.has_header('Content-Encoding'):
+        return response
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    if content_type not in getattr(view, 'compressible_content_types', COMPRESSIBLE_CONTENT_TYPES):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+    compressor = get_compressor(encoding, view)
+    if getattr(response, 'streaming', False):
+        response.streaming_content = compress_sequence(response.streaming_content, compressor)
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+    else:
+        if len(response.content) < getattr(view, 'compress_min_length', 1024):
+            return response
+        compressed = compressor.compress(response.content) + compressor.finish()
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(response.content))
+    if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        # the compressed content differs byte by byte, but If-None-Match still matches
+        response['ETag'] = 'W/' + response['ETag']
+    response['Content-Encoding'] = encoding
+    return response
@@ -1,25 +1,137 @@
 # -*- coding: utf-8 -*-
+import copy
 import json
+import logging
+import time
+from itertools import islice
 
 from django import http
-from django.core import serializers
 from django.core.exceptions import ValidationError
 from django.db.models.fields import FieldDoesNotExist
 from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.models import modelform_factory
-from django.http import HttpResponse
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.generic import FormView
 from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
 from django.db.models import ForeignKey, DateTimeField, DateField, BooleanField
+from django.db.models.query import prefetch_related_objects
 
 import dateutil.parser as dateparser
 
+from djangular.core import singleflight
+from djangular.core.concurrency import run_concurrently
+from djangular.core.writebehind import write_behind
+from djangular.views.compression import compress_response
+from djangular.views.encoding import encode_payload, decode_payload, accepts_msgpack, patch_vary_accept
+from djangular.views.instrumentation import (NULL_INSTRUMENTATION, QueryCounter, is_instrumented,
+	instrument_dispatch)
+from djangular.views.mixins import get_related_lookups, prefetch_concurrently
+from djangular.views.serialization import get_serialization_plan, parse_relations
+
+logger = logging.getLogger('djangular')
+
+PRIMARY_PIN_SESSION_KEY = 'djangular:pin-primary-until'
+
+
+class RelationsLimitExceeded(ValueError):
+	pass
+
+
+class QueryBudgetExceeded(Exception):
+	pass
+
+
+def extra(bulk=False, select_related=(), prefetch_related=(), annotate=None):
+	"""
+	Register a method of an NgCRUDView as the computed extra property of the same name. It is
+	called with an object and returns its value or, if 'bulk' is set, it is called with a list of
+	objects and returns a dictionary mapping their primary keys onto the values.
+	The lookups in 'select_related', 'prefetch_related' and the dictionary 'annotate' are applied
+	to the objects, before the extra is computed, so that it does not query each object on its own.
+	"""
+	def decorator(func):
+		func.extra_options = {
+			'bulk': bulk,
+			'select_related': tuple(select_related),
+			'prefetch_related': tuple(prefetch_related),
+			'annotate': annotate or {},
+		}
+		return func
+	return decorator
+
+
+def measure_relations(relations, depth=1):
+	"""
+	Return a tuple containing the number of relations and the depth of their nesting
+	"""
+	count, max_depth = 0, 0
+	for options in relations.values():
+		count += 1
+		max_depth = max(max_depth, depth)
+		nested = isinstance(options, dict) and options.get('relations')
+		if nested:
+			nested_count, nested_depth = measure_relations(nested, depth + 1)
+			count += nested_count
+			max_depth = max(max_depth, nested_depth)
+	return count, max_depth
+
+
+def to_columns(objects):
+	"""
+	Convert a list of dictionaries into the columnar format, which holds the keys only once, in
+	'columns', and the values of each dictionary as a list, in 'rows'. Missing keys become null
+	"""
+	columns, seen = [], set()
+	for obj in objects:
+		for key in obj:
+			if key not in seen:
+				seen.add(key)
+				columns.append(key)
+	return {'columns': columns, 'rows': [[obj.get(key) for key in columns] for obj in objects]}
+
+
 class NgCRUDView(FormView):
 	"""
 	Basic view to support default angular $resource CRUD actions on server side
 	Subclass and override model_class with your model
 
 	Optional 'pk' GET parameter must be passed when object identification is required (save to update and delete)
+
+	Since relations are specified by the client, they can be limited through 'max_relations' and
+	'max_relations_depth'. If 'query_budget' is set, requests executing more SQL queries fail with
+	QueryBudgetExceeded, or, if 'query_budget_strict' is False, are logged. This defaults to strict
+	while settings.DEBUG is set.
+
+	If 'stream_query' is set, the list returned by ng_query is streamed to the client while the
+	objects are serialized. The query budget then is not enforced on the streamed content.
+
+	Clients may request lists in the columnar format, see to_columns(), by adding the GET
+	parameter 'format=columns' or by accepting the media type in 'columns_media_type'. Such lists
+	are never streamed.
+
+	If 'msgpack' is set, clients accepting 'application/x-msgpack' are answered using MessagePack,
+	and may send their data encoded that way. Such lists are never streamed either.
+
+	If 'concurrent_relations' is set, the multi valued relations of the objects are prefetched
+	concurrently before serialization, one thread per independent relation
+
+	Extras requested by the client, for which the view has a method decorated with @extra, are
+	computed by the view for all objects at once and memoized during the request. Other extras are
+	looked up on each object by the serializer, if they are named in 'allowed_extras'
+
+	Reads are sent to the database alias in 'read_database', or in settings.DJANGULAR_READ_DATABASE,
+	while writes go to the primary database. After a successful write, the reads of the same session
+	are sent to the primary database for 'primary_pin_timeout' seconds, so that the client does
+	not read stale data from a lagging replica
+
+	If 'single_flight' is set, or settings.DJANGULAR_SINGLE_FLIGHT, identical lists requested
+	concurrently, as identified by get_single_flight_key(), are queried and encoded only once, and
+	all those requests are answered with the same content
+
+	If 'write_behind' is set, PATCH requests updating plain fields of the same object within
+	'write_behind_delay' seconds are coalesced, see ng_update_write_behind()
 	"""
 	model_class = None
 	model_obj = None
@@ -30,8 +142,31 @@ class NgCRUDView(FormView):
 	update_form_class = None
 	relations = {}
 	extras = []
+	allowed_extras = ()
 	GET = None
 	request = None
+	instrument = None
+	instrumentation = NULL_INSTRUMENTATION
+	max_relations = None
+	max_relations_depth = None
+	query_budget = None
+	query_budget_strict = None
+	query_counter = None
+	stream_query = False
+	columns_media_type = 'application/vnd.djangular.columns+json'
+	list_format = None
+	compress = None
+	compress_min_length = 1024
+	compress_level = 6
+	brotli_quality = 5
+	msgpack = None
+	concurrent_relations = False
+	stream_chunk_size = 100
+	read_database = None
+	primary_pin_timeout = 10
+	single_flight = None
+	write_behind = False
+	write_behind_delay = 0.05
 
 	def dispatch(self, request, *args, **kwargs):
 		"""
@@ -40,16 +175,44 @@ class NgCRUDView(FormView):
 		* $get - ng_get
 		* $save - ng_save
 		* $delete and $remove - ng_delete
+		If instrumentation is enabled, the timings of each phase are added to the response
 		"""
+		if is_instrumented(self):
+			response = instrument_dispatch(self, self.dispatch_crud, request, *args, **kwargs)
+		else:
+			response = self.dispatch_crud(request, *args, **kwargs)
+		return compress_response(self, request, response)
+
+	def dispatch_crud(self, request, *args, **kwargs):
 		self.request = request
-		self.prepare_relations_and_extras(request)
+		try:
+			self.prepare_relations_and_extras(request)
+		except ValueError as err:
+			return http.HttpResponseBadRequest(err)
 
 		if 'pk' in kwargs:
 			self.model_pk = kwargs['pk']
 		if 'slug' in kwargs:
 			self.model_slug = kwargs['slug']
 
-		self.create_model_object()
+		if self.query_budget is None:
+			response = self.dispatch_method(request, *args, **kwargs)
+		else:
+			self.query_counter = QueryCounter().start()
+			try:
+				response = self.dispatch_method(request, *args, **kwargs)
+			finally:
+				self.query_counter.stop()
+			self.check_query_budget()
+		if request.method != 'GET' and response.status_code < 400:
+			self.pin_to_primary()
+		return response
+
+	def dispatch_method(self, request, *args, **kwargs):
+		if self.is_write_behind():
+			return self.ng_update_write_behind(request, *args, **kwargs)
+		with self.instrumentation.phase('resolve'):
+			self.create_model_object()
 
 		if request.method == 'GET':
 			if self.model_pk or self.model_slug:
@@ -65,6 +228,22 @@ class NgCRUDView(FormView):
 			return self.ng_delete(request, *args, **kwargs)
 		raise ValueError('This view can not handle method %s' % request.method)
 
+	def gather(self, *funcs):
+		"""
+		Call several independent functions, such as queries, concurrently on a pool of threads
+		and return their results in the given order
+		"""
+		return run_concurrently(*funcs)
+
+	def prefetch_objects(self, objects):
+		"""
+		If 'concurrent_relations' is set, fetch the multi valued relations of the given objects
+		concurrently, before they are serialized
+		"""
+		if self.concurrent_relations and self.relations:
+			prefetch_concurrently(objects, get_related_lookups(self.model_class, self.relations)[1])
+		return objects
+
 	def custom_permission_check(self):
 		"""
 		This method is called if the basic member permission check fails.
@@ -88,32 +267,181 @@ class NgCRUDView(FormView):
 		if not self.relations:
 			self.relations = request.GET.get('relations', {})
 			if self.relations:
-				self.relations = json.loads(self.relations)
+				self.relations = parse_relations(self.relations)
+				self.check_relations_limits(self.relations)
 
 		if not self.extras:
 			self.extras = request.GET.get('extras', [])
 			if self.extras:
 				self.extras = self.extras.split(',')
+		self.extras_values = {}
+
+		self.list_format = request.GET.get('format')
+		if not self.list_format and self.columns_media_type and self.columns_media_type in request.META.get('HTTP_ACCEPT', ''):
+			self.list_format = 'columns'
 
-		# Strip out the relations / extras params from the GET for other methods to use
+		# Strip out the relations / extras / format params from the GET for other methods to use
 		self.GET = request.GET.copy()
 		if 'relations' in self.GET:
 			self.GET.pop('relations')
 		if 'extras' in self.GET:
 			self.GET.pop('extras')
+		if 'format' in self.GET:
+			self.GET.pop('format')
+
+	def check_relations_limits(self, relations):
+		"""
+		Raise RelationsLimitExceeded if the relations requested by the client are too many or too
+		deeply nested
+		"""
+		if not isinstance(relations, dict):
+			raise RelationsLimitExceeded('Relations must be a JSON object')
+		count, depth = measure_relations(relations)
+		if self.max_relations is not None and count > self.max_relations:
+			raise RelationsLimitExceeded('At most %d relations may be requested, got %d' % (self.max_relations, count))
+		if self.max_relations_depth is not None and depth > self.max_relations_depth:
+			raise RelationsLimitExceeded('Relations may be nested at most %d levels deep, got %d' %
+				(self.max_relations_depth, depth))
+
+	def check_query_budget(self):
+		"""
+		Enforce the query budget of this view. Called after each serialized object, so that a
+		fan-out of queries is aborted early
+		"""
+		if self.query_counter is None:
+			return
+		count = self.query_counter.count()
+		if count <= self.query_budget:
+			return
+		message = '%s executed %d queries, exceeding its budget of %d queries (relations=%s, extras=%s)' % (
+			self.__class__.__name__, count, self.query_budget, json.dumps(self.relations), ','.join(self.extras))
+		strict = settings.DEBUG if self.query_budget_strict is None else self.query_budget_strict
+		if strict:
+			raise QueryBudgetExceeded(message)
+		if not getattr(self, '_query_budget_logged', False):
+			self._query_budget_logged = True
+			logger.warning(message)
+
+	def get_read_database(self):
+		"""
+		Return the alias of the database to read from, or None to leave the choice to the database
+		routers. This is the replica, unless the session recently wrote to the primary
+		"""
+		alias = self.read_database or getattr(settings, 'DJANGULAR_READ_DATABASE', None)
+		if not alias or self.request.method != 'GET':
+			return None
+		if self.is_pinned_to_primary():
+			return DEFAULT_DB_ALIAS
+		return alias
+
+	def get_queryset(self):
+		"""
+		Return all objects of 'model_class', read from the database returned by get_read_database
+		"""
+		queryset = self.model_class.objects.all()
+		alias = self.get_read_database()
+		return queryset.using(alias) if alias else queryset
+
+	def is_pinned_to_primary(self):
+		session = getattr(self.request, 'session', None)
+		return session is not None and session.get(PRIMARY_PIN_SESSION_KEY, 0) > time.time()
+
+	def pin_to_primary(self):
+		"""
+		Send the reads of this session to the primary database for 'primary_pin_timeout' seconds.
+		Without a replica to read from, the session is left untouched
+		"""
+		alias = self.read_database or getattr(settings, 'DJANGULAR_READ_DATABASE', None)
+		if not alias or alias == DEFAULT_DB_ALIAS:
+			return
+		session = getattr(self.request, 'session', None)
+		if session is not None and self.primary_pin_timeout:
+			session[PRIMARY_PIN_SESSION_KEY] = time.time() + self.primary_pin_timeout
+
+	def get_registered_extras(self):
+		"""
+		Return a dictionary mapping the names of the extras requested by the client, which are
+		computed by this view, onto their methods
+		"""
+		registered = {}
+		for name in self.extras:
+			method = getattr(self, name, None)
+			if hasattr(method, 'extra_options'):
+				registered[name] = method
+		return registered
+
+	def apply_extras_to_query(self, queryset):
+		"""
+		Add the select_related lookups and annotations required by the requested extras
+		"""
+		select, annotations = [], {}
+		for method in self.get_registered_extras().values():
+			select.extend(method.extra_options['select_related'])
+			annotations.update(method.extra_options['annotate'])
+		if select:
+			queryset = queryset.select_related(*select)
+		if annotations:
+			queryset = queryset.annotate(**annotations)
+		return queryset
+
+	def compute_extras(self, objects):
+		"""
+		Compute the requested extras, which are registered on this view, for all given objects at
+		once. Values are memoized in 'extras_values' for the duration of the request
+		"""
+		extras = self.get_registered_extras()
+		for name in extras:
+			self.extras_values.setdefault(name, {})
+		objects = [obj for obj in objects if any(obj.pk not in self.extras_values[name] for name in extras)]
+		if not objects:
+			return
+		lookups = []
+		for method in extras.values():
+			lookups.extend(lookup for lookup in method.extra_options['prefetch_related'] if lookup not in lookups)
+		if lookups:
+			prefetch_related_objects(objects, lookups)
+		for name, method in sorted(extras.items()):
+			values = self.extras_values[name]
+			pending = [obj for obj in objects if obj.pk not in values]
+			if not pending:
+				continue
+			if method.extra_options['bulk']:
+				values.update(method(pending))
+			else:
+				for obj in pending:
+					values[obj.pk] = method(obj)
+
+	def serialize_object(self, obj):
+		"""
+		Return the dictionary of a single object, including the extras computed by this view
+		"""
+		data = self.build_model_dict(obj)[0]
+		extras = self.get_registered_extras()
+		if extras:
+			self.compute_extras([obj])
+			for name in extras:
+				data[name] = self.extras_values[name].get(obj.pk)
+		return data
+
+	def get_serializer_extras(self):
+		"""
+		Return the extras to be looked up on each object by the serializer
+		"""
+		registered = self.get_registered_extras()
+		return [name for name in self.extras if name not in registered]
 
 	def create_model_object(self):
 		"""
 		Attempts to create the local model object
 		"""
+		queryset = self.get_queryset()
+		if self.request.method == 'GET':
+			queryset = self.apply_extras_to_query(queryset)
 		try:
-			print "----", self.model_pk, self.model_slug
 			if self.model_pk:
-				print "a"
-				self.model_obj = self.model_class.objects.get(pk=self.model_pk)
+				self.model_obj = queryset.get(pk=self.model_pk)
 			elif self.model_slug:
-				print "b"
-				self.model_obj = self.model_class.objects.get(slug=self.model_slug)
+				self.model_obj = queryset.get(slug=self.model_slug)
 		except:
 			self.model_obj = None
 			raise ValueError("Attempted to get an object by 'pk', but no 'pk' is present. Missing GET parameter?")
@@ -124,20 +452,46 @@ class NgCRUDView(FormView):
 		"""
 		return modelform_factory(self.model_class)
 
-	def build_model_dict(self):
+	def build_model_dict(self, obj=None):
 		"""
 		Builds a dictionary with fieldnames and corresponding values
+		If obj is not passed, the object identified by 'pk' or 'slug' is used
 		"""
-		if self.model_obj:
-			serialized_data = serializers.serialize('json', [self.model_obj,], indent=4 if settings.DEBUG else 0,
-				relations=self.relations, extras=self.extras, flatten=True)
-
-			return json.loads(serialized_data)
+		obj = obj or self.model_obj
+		if obj:
+			with self.instrumentation.phase('serialize'):
+				return [self.get_serialization_plan(obj.__class__).serialize(obj)]
 		else:
 			return {}
 
+	def get_serialization_plan(self, model):
+		"""
+		Return the compiled serialization plan for the requested relations and extras. It is
+		looked up once per request and model
+		"""
+		plans = self.__dict__.setdefault('_serialization_plans', {})
+		if model not in plans:
+			plans[model] = get_serialization_plan(model, self.relations, self.get_serializer_extras(),
+				allowed_extras=self.allowed_extras)
+		return plans[model]
+
 	def build_json_response(self, data):
-		response = HttpResponse(json.dumps(data, cls=DjangoJSONEncoder), self.content_type)
+		with self.instrumentation.phase('encode'):
+			content, content_type = encode_payload(self, self.request, data, self.content_type)
+		response = HttpResponse(content, content_type)
+		response['Cache-Control'] = 'no-cache'
+		return patch_vary_accept(self, response)
+
+	def build_streaming_json_response(self, objects):
+		"""
+		Stream a JSON array, encoding each object as soon as it is available
+		"""
+		def encode():
+			yield '['
+			for index, obj in enumerate(objects):
+				yield (index and ',' or '') + json.dumps(obj, cls=DjangoJSONEncoder)
+			yield ']'
+		response = StreamingHttpResponse(encode(), self.content_type)
 		response['Cache-Control'] = 'no-cache'
 		return response
 
@@ -148,7 +502,7 @@ class NgCRUDView(FormView):
 		if self.request.POST or self.request.FILES:
 			pass
 		else:
-			kwargs['data'] = json.loads(self.request.body)
+			kwargs['data'] = decode_payload(self, self.request)
 
 		kwargs['request'] = self.request
 
@@ -161,26 +515,130 @@ class NgCRUDView(FormView):
 		Get query to use in ng_query
 		Allows for easier overriding
 		"""
-		return self.model_class.objects.filter(**query_attrs)
+		return self.get_queryset().filter(**query_attrs)
+
+	def get_filtered_query(self):
+		"""
+		Return the query filtered by the remaining GET parameters
+		"""
+		query_attrs = dict([(param, val) for param, val in self.GET.iteritems() if val])
+		return self.apply_extras_to_query(self.get_query(**query_attrs))
+
+	def query_objects(self):
+		"""
+		Build the list of serialized objects returned by ng_query
+		"""
+		objects = []
+		with self.instrumentation.phase('query'):
+			query = self.prefetch_objects(list(self.get_filtered_query()))
+			self.compute_extras(query)
+		for obj in query:
+			objects.append(self.serialize_object(obj))
+			self.check_query_budget()
+		return objects
+
+	@classmethod
+	def get_bootstrap_data(cls, request, **initkwargs):
+		"""
+		Return the list of objects, which ng_query returns for a GET request without parameters,
+		so that it can be embedded into the page rendered for 'request'. The request passes through
+		dispatch(), so that its decorators and permission checks apply. Unless it is answered with
+		status 200, None is returned, and the client shall fetch the list itself
+		"""
+		request = copy.copy(request)
+		request.method = 'GET'
+		request.GET = QueryDict('')
+		request.META = dict(request.META, QUERY_STRING='')
+		# answer with plain JSON
+		for header in ('HTTP_ACCEPT', 'HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH'):
+			request.META.pop(header, None)
+		response = cls.as_view(**initkwargs)(request)
+		if response.status_code != 200:
+			return None
+		content = b''.join(response.streaming_content) if response.streaming else response.content
+		return json.loads(content.decode('utf-8'))
 
 	def ng_query(self, request, *args, **kwargs):
 		"""
 		Used when angular's query() method is called
 		Build an array of all objects, return json response
 		"""
-		objects = []
+		if self.stream_query and self.list_format != 'columns' and not accepts_msgpack(self, request):
+			response = self.build_streaming_json_response(self.iter_serialized_objects(self.get_filtered_query()))
+			return self.patch_list_vary(response)
+		if self.is_single_flight():
+			content, content_type = singleflight.single_flight(self.get_single_flight_key(), self.encode_query)
+		else:
+			content, content_type = self.encode_query()
+		response = HttpResponse(content, content_type)
+		response['Cache-Control'] = 'no-cache'
+		return self.patch_list_vary(response)
 
-		query_attrs = dict([(param, val) for param, val in self.GET.iteritems() if val])
-		for obj in self.get_query(**query_attrs):
-			objects.append(self.build_model_dict(obj))
-		return self.build_json_response(objects)
+	def patch_list_vary(self, response):
+		"""
+		Lists vary on Accept, if their format is negotiated through 'columns_media_type', or their
+		encoding through MessagePack
+		"""
+		if self.columns_media_type:
+			patch_vary_headers(response, ('Accept',))
+		return patch_vary_accept(self, response)
+
+	def encode_query(self):
+		"""
+		Return the encoded list of objects returned by ng_query and its content type
+		"""
+		objects = self.query_objects()
+		if self.list_format == 'columns':
+			objects = to_columns(objects)
+		with self.instrumentation.phase('encode'):
+			return encode_payload(self, self.request, objects, self.content_type)
+
+	def is_single_flight(self):
+		if self.single_flight is None:
+			return getattr(settings, 'DJANGULAR_SINGLE_FLIGHT', False)
+		return self.single_flight
+
+	def get_single_flight_key(self):
+		"""
+		Return the key identifying identical lists. Lists of different users are never shared;
+		override this, if the list does not depend on the user
+		"""
+		user = getattr(self.request, 'user', None)
+		return json.dumps([
+			'%s.%s' % (self.__class__.__module__, self.__class__.__name__),
+			getattr(self, 'kwargs', {}),
+			sorted(self.GET.lists()),
+			self.relations,
+			self.extras,
+			self.list_format,
+			accepts_msgpack(self, self.request),
+			self.get_read_database(),
+			user.pk if user is not None and user.is_authenticated() else None,
+		], cls=DjangoJSONEncoder, sort_keys=True)
+
+	def iter_serialized_objects(self, queryset):
+		"""
+		Serialize the objects of the queryset while iterating over it, in chunks of
+		'stream_chunk_size' objects, so that relations and extras are fetched once per chunk
+		"""
+		iterator = queryset.iterator()
+		while True:
+			chunk = list(islice(iterator, self.stream_chunk_size))
+			if not chunk:
+				break
+			self.prefetch_objects(chunk)
+			self.compute_extras(chunk)
+			for obj in chunk:
+				yield self.serialize_object(obj)
 
 	def ng_get(self, request, *args, **kwargs):
 		"""
 		Used when angular's get() method is called
 		Returns a JSON response of a single object dictionary
 		"""
-		data = self.build_model_dict()[0]
+		with self.instrumentation.phase('query'):
+			self.prefetch_objects([self.model_obj])
+		data = self.serialize_object(self.model_obj)
 		return self.build_json_response(data)
 
 	def ng_save(self, request, *args, **kwargs):
@@ -195,9 +653,7 @@ class NgCRUDView(FormView):
 		if form.is_valid():
 			obj = form.save(commit=False)
 			obj.save(request=request)
-			return self.build_json_response(self.build_model_dict(obj))
-		else:
-			print form.errors
+			return self.build_json_response(self.serialize_object(obj))
 		raise ValidationError("Form not valid", form.errors)
 
 	def ng_update(self, request, *args, **kwargs):
@@ -216,20 +672,9 @@ class NgCRUDView(FormView):
 			if not key.startswith("m2m-"):
 				try:
 					field_object, model, direct, m2m = obj._meta.get_field_by_name(key)
+					value = self.coerce_field_value(field_object, value)
 					if isinstance(field_object, ForeignKey):
 						key = "%s_id" % key
-					elif isinstance(field_object, DateTimeField):
-						if value == '0' or value == 0:
-							value = None
-						else:
-							value = dateparser.parse(value, dayfirst=True)
-					elif isinstance(field_object, DateField):
-						if value == '0' or value == 0:
-							value = None
-						else:
-							value = dateparser.parse(value, dayfirst=True).date()
-					elif isinstance(field_object, BooleanField):
-						value = value in ['true', '1', 't', 'y', 'yes']
 
 					if hasattr(obj, key):
 						setattr(obj, key, value)
@@ -256,7 +701,68 @@ class NgCRUDView(FormView):
 				elif m2m and update_type == "m2m-delete":
 					m2m.remove(value)
 
-		return self.build_json_response(self.build_model_dict(obj)[0])
+		return self.build_json_response(self.serialize_object(obj))
+
+	def coerce_field_value(self, field_object, value):
+		"""
+		Convert a value sent by $patch() into a value of the given field
+		"""
+		if isinstance(field_object, DateTimeField):
+			if value == '0' or value == 0:
+				return None
+			return dateparser.parse(value, dayfirst=True)
+		elif isinstance(field_object, DateField):
+			if value == '0' or value == 0:
+				return None
+			return dateparser.parse(value, dayfirst=True).date()
+		elif isinstance(field_object, BooleanField):
+			return value in ['true', '1', 't', 'y', 'yes']
+		return value
+
+	def is_write_behind(self):
+		"""
+		Return True, if this request is a PATCH of plain fields, which may be coalesced
+		"""
+		if not self.write_behind or self.request.method != 'PATCH' or not self.model_pk:
+			return False
+		return not any(key.startswith('m2m-') for key in self.GET)
+
+	def ng_update_write_behind(self, request, *args, **kwargs):
+		"""
+		Called on $patch() if 'write_behind' is set
+		Rather than fetching and saving the object, the field values are merged with those of other
+		PATCH requests for the same object, arriving within 'write_behind_delay' seconds. The last
+		value of each field wins. All fields are written using one update(), then the object is
+		fetched once and each client receives it as acknowledgement. The header X-Coalesced-Writes
+		contains the number of coalesced requests.
+		Note that update() neither calls the model's save() method nor sends any signals
+		"""
+		fields = {}
+		opts = self.model_class._meta
+		for key, value in self.GET.iteritems():
+			try:
+				field_object, model, direct, m2m = opts.get_field_by_name(key)
+			except FieldDoesNotExist:
+				continue
+			if direct and not m2m:
+				fields[field_object.name] = self.coerce_field_value(field_object, value)
+		queryset = self.get_queryset().filter(pk=self.model_pk)
+
+		def flush(fields):
+			with self.instrumentation.phase('query'):
+				if fields:
+					queryset.update(**fields)
+				objects = list(queryset[:1])
+				return objects[0] if objects else None
+
+		# writers are coalesced only if they see the object through the same query
+		key = (self.model_class, str(queryset.query))
+		obj, writers = write_behind(key, fields, flush, self.write_behind_delay)
+		if obj is None:
+			raise ValueError("Attempted to get an object by 'pk', but no 'pk' is present. Missing GET parameter?")
+		response = self.build_json_response(self.serialize_object(obj))
+		response['X-Coalesced-Writes'] = str(writers)
+		return response
 
 	def ng_delete(self, request, *args, **kwargs):
 		"""
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Content negotiation between JSON and MessagePack for djangular's views. MessagePack is a binary
+encoding of the same data structures, which is smaller and faster to decode than JSON, notably
+for numeric data. It requires the package ``msgpack``.
+
+Enable it for all views with ``DJANGULAR_MSGPACK = True`` in the settings, or for a single view
+by setting its class attribute ``msgpack = True``. Such a view then answers with MessagePack, if
+the client accepts ``application/x-msgpack``, and decodes request bodies sent with this content
+type. All other clients still get JSON.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_CONTENT_TYPE = 'application/json;charset=UTF-8'
+MSGPACK_CONTENT_TYPES = ('application/x-msgpack', 'application/msgpack')
+
+_json_encoder = DjangoJSONEncoder()
+
+
+def _encode_default(obj):
+    # dates, times, decimals, etc. are encoded as strings, as they would be in JSON
+    return _json_encoder.default(obj)
+
+
+def is_msgpack_enabled(view):
+    if msgpack is None:
+        return False
+    enabled = getattr(view, 'msgpack', None)
+    if enabled is None:
+        return getattr(settings, 'DJANGULAR_MSGPACK', False)
+    return enabled
+
+
+def accepts_msgpack(view, request):
+    """
+    Return True, if the response to this request shall be encoded using MessagePack.
+    """
+    if not is_msgpack_enabled(view):
+        return False
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return any(content_type in accept for content_type in MSGPACK_CONTENT_TYPES)
+
+
+def encode_payload(view, request, data, json_content_type=JSON_CONTENT_TYPE):
+    """
+    Encode ``data`` as negotiated with the client. Returns the content and its content type.
+    """
+    if accepts_msgpack(view, request):
+        # byte strings, such as the field names on Python 2, are packed as strings, not as binary
+        return msgpack.packb(data, default=_encode_default, use_bin_type=False), MSGPACK_CONTENT_TYPES[0]
+    return json.dumps(data, cls=DjangoJSONEncoder), json_content_type
+
+
+def decode_payload(view, request):
+    """
+    Decode the body of the request, according to its content type. Raises ValueError if the
+    body can not be decoded.
+    """
+    content_type = request.META.get('CONTENT_TYPE', '').split(';')[0].strip()
+    if content_type not in MSGPACK_CONTENT_TYPES:
+        return json.loads(request.body)
+    if not is_msgpack_enabled(view):
+        raise ValueError('This view does not accept content of type %s' % content_type)
+    try:
+        return msgpack.unpackb(request.body, raw=False)
+    except Exception as err:
+        raise ValueError('Invalid MessagePack content: %s' % err)
+
+
+def patch_vary_accept(view, response):
+    """
+    Responses of views, which may encode their content using MessagePack, vary on Accept.
+    """
+    if is_msgpack_enabled(view):
+        patch_vary_headers(response, ('Accept',))
+    return response
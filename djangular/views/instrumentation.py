@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in instrumentation of djangular's views. If enabled, a view measures the time spent in each
+phase of a request, such as object resolution, querying, serialization and JSON encoding, counts
+the SQL queries and the size of the payload. These figures are added as ``Server-Timing`` header
+to the response and are sent through the signal ``request_instrumented``.
+
+Enable it for all views with ``DJANGULAR_INSTRUMENTATION = True`` in the settings, or for a
+single view by setting its class attribute ``instrument = True``. When disabled, each phase costs
+one call onto a shared no-op object.
+"""
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+
+request_instrumented = Signal(providing_args=['view', 'request', 'response', 'timings', 'queries',
+                                              'sql_time', 'size'])
+
+
+class _NullPhase(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null_phase = _NullPhase()
+
+
+class NullInstrumentation(object):
+    """
+    Instrumentation used by views, while disabled.
+    """
+    enabled = False
+
+    def phase(self, name):
+        return _null_phase
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class _Phase(object):
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        timings = self.instrumentation.timings
+        timings[self.name] = timings.get(self.name, 0.0) + time.time() - self.start
+        return False
+
+
+class QueryCounter(object):
+    """
+    Counts the SQL queries executed on all database connections between ``start`` and ``stop``,
+    using Django's debug cursor, which is enabled meanwhile. May be used as context manager.
+    """
+    def __init__(self):
+        self._cursor_states = None
+        self.executed = []
+
+    def start(self):
+        self._cursor_states = []
+        for connection in connections.all():
+            self._cursor_states.append((connection, connection.use_debug_cursor, len(connection.queries)))
+            connection.use_debug_cursor = True
+        return self
+
+    def count(self):
+        """
+        Return the number of queries executed so far.
+        """
+        if self._cursor_states is None:
+            return len(self.executed)
+        return sum(len(connection.queries) - num_queries for connection, _, num_queries in self._cursor_states)
+
+    def stop(self):
+        for connection, use_debug_cursor, num_queries in self._cursor_states:
+            self.executed += connection.queries[num_queries:]
+            connection.use_debug_cursor = use_debug_cursor
+            if not use_debug_cursor and not settings.DEBUG:
+                # do not let the query log grow, when it would not have been recorded otherwise
+                del connection.queries[num_queries:]
+        self._cursor_states = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+class Instrumentation(object):
+    """
+    Collects the timings and the number of SQL queries of a single request.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.timings = OrderedDict()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.size = None
+        self.start = time.time()
+        self._counter = QueryCounter().start()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def stop(self):
+        self.timings['total'] = time.time() - self.start
+        self._counter.stop()
+        self.queries = len(self._counter.executed)
+        self.sql_time = sum(float(query.get('time') or 0) for query in self._counter.executed)
+
+    def server_timing(self):
+        metrics = ['%s;dur=%.3f' % (name, duration * 1000) for name, duration in self.timings.items()]
+        metrics.append('db;dur=%.3f;desc="%d queries"' % (self.sql_time * 1000, self.queries))
+        if self.size is not None:
+            metrics.append('size;desc="%d bytes"' % self.size)
+        return ', '.join(metrics)
+
+
+def is_instrumented(view):
+    instrument = getattr(view, 'instrument', None)
+    if instrument is None:
+        return getattr(settings, 'DJANGULAR_INSTRUMENTATION', False)
+    return instrument
+
+
+def instrument_dispatch(view, handler, request, *args, **kwargs):
+    """
+    Call ``handler`` while collecting the timings of the request, then add them to the response.
+    """
+    if view.instrumentation.enabled:
+        # nested dispatch, for instance JSONResponseMixin on top of NgCRUDView
+        return handler(request, *args, **kwargs)
+    instrumentation = view.instrumentation = Instrumentation()
+    try:
+        response = handler(request, *args, **kwargs)
+    finally:
+        instrumentation.stop()
+    if not getattr(response, 'streaming', False):
+        instrumentation.size = len(response.content)
+    response['Server-Timing'] = instrumentation.server_timing()
+    request_instrumented.send(sender=view.__class__, view=view, request=request, response=response,
+                              timings=dict(instrumentation.timings), queries=instrumentation.queries,
+                              sql_time=instrumentation.sql_time, size=instrumentation.size)
+    return response
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.cache import patch_cache_control
+from django.views.generic import View
+
+from djangular.core.jobs import get_job, get_job_owner
+from djangular.views.encoding import encode_payload, patch_vary_accept
+
+
+class NgJobStatusView(View):
+    """
+    Report the state of a background job, submitted by an action decorated with
+    ``@allowed_action(background=True)``. Only the user or session, which submitted the job,
+    may query its state. Finished jobs contain the ``result`` of the action, failed jobs an
+    ``error``.
+    """
+    msgpack = None
+
+    def get(self, request, job_id=None, *args, **kwargs):
+        state = get_job(job_id)
+        if state is None or not self.is_owner(request, state['owner']):
+            return HttpResponseNotFound('Unknown job')
+        state = dict((key, value) for key, value in state.items() if key != 'owner')
+        content, content_type = encode_payload(self, request, state)
+        response = HttpResponse(content, content_type=content_type)
+        patch_cache_control(response, no_cache=True)
+        return patch_vary_accept(self, response)
+
+    def is_owner(self, request, owner):
+        if not any(owner.values()):
+            # submitted by an anonymous request without a session
+            return False
+        current = get_job_owner(request)
+        return all(current[key] == value for key, value in owner.items() if value is not None)
@@ -1,27 +1,152 @@
 # -*- coding: utf-8 -*-
-import json
-from django.conf import settings
-from django.core import serializers
-from django.core.serializers.json import DjangoJSONEncoder
+from collections import OrderedDict
+from functools import partial
+from django.core.cache import cache
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.db.models.query import prefetch_related_objects
 from django.http import HttpResponse, HttpResponseBadRequest
+from djangular.core.concurrency import run_concurrently
+from djangular.core.jobs import submit_job, get_job_owner
+from djangular.core.singleflight import single_flight
+from djangular.views.action_cache import ActionCache
+from djangular.views.compression import compress_response
+from djangular.views.encoding import encode_payload, decode_payload, patch_vary_accept
+from djangular.views.instrumentation import NULL_INSTRUMENTATION, is_instrumented, instrument_dispatch
+from djangular.views.serialization import get_relation, get_serialization_plan, parse_relations
 
 
-def allowed_action(func):
+def allowed_action(func=None, cache_timeout=None, cache_key=None, vary_on_user=False, vary_on_language=False,
+                   cache_tags=(), background=False):
     """
     All methods which shall be callable through a given Ajax 'action' must be
     decorated with @allowed_action. This is required for safety reasons. It
     inhibits the caller to invoke all available methods of a class.
+
+    Pass ``cache_timeout`` in seconds, to cache the encoded results of actions, which always
+    return the same data for the same payload. ``cache_key`` restricts the key to these items
+    of the payload. ``cache_tags`` are strings or model classes, whose changes invalidate the
+    cached results, see ``djangular.views.action_cache``.
+
+    Pass ``background=True`` for slow actions. They are submitted as jobs, and the client
+    immediately receives a response with status 202 and the id of the job, see
+    ``djangular.core.jobs``.
     """
+    if func is None:
+        return partial(allowed_action, cache_timeout=cache_timeout, cache_key=cache_key, vary_on_user=vary_on_user,
+                       vary_on_language=vary_on_language, cache_tags=cache_tags, background=background)
     setattr(func, 'is_allowed_action', None)
+    if background:
+        func.run_in_background = True
+    if cache_timeout is not None:
+        func.action_cache = ActionCache(cache_timeout, cache_key, vary_on_user, vary_on_language, cache_tags)
     return func
 
 
+def get_related_lookups(model, relations, prefix=''):
+    """
+    Translate a relations definition, as used by ``build_model_dict``, into two lists of
+    lookups, one to be passed to ``select_related`` and one to ``prefetch_related``.
+    """
+    select, prefetch = [], []
+    for name, options in relations.items():
+        relation = get_relation(model, name)
+        if relation is None:
+            continue
+        related_model, single = relation
+        lookup = prefix + name
+        if single:
+            select.append(lookup)
+        else:
+            prefetch.append(lookup)
+        nested = isinstance(options, dict) and options.get('relations')
+        if nested:
+            nested_select, nested_prefetch = get_related_lookups(related_model, nested, lookup + '__')
+            if single:
+                select += nested_select
+                prefetch += nested_prefetch
+            else:
+                prefetch += nested_select + nested_prefetch
+    return select, prefetch
+
+
+def prefetch_relations(queryset, relations):
+    """
+    Return the queryset, which fetches all objects required to serialize ``relations`` using
+    one query for the single valued relations, plus one query for each multi valued relation.
+    """
+    select, prefetch = get_related_lookups(queryset.model, relations or {})
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def _prefetch_branch(instances, lookups):
+    # prefetch into copies of the instances, so that concurrent branches never share a cache
+    clones = []
+    for instance in instances:
+        clone = instance.__class__.__new__(instance.__class__)
+        clone.__dict__ = dict(instance.__dict__)
+        clone.__dict__.pop('_prefetched_objects_cache', None)
+        clones.append(clone)
+    prefetch_related_objects(clones, lookups)
+    return clones
+
+
+def prefetch_concurrently(instances, lookups):
+    """
+    Prefetch the multi valued ``lookups`` into the given model instances, as ``prefetch_related``
+    would. Lookups starting with the same relation form a branch, and independent branches are
+    fetched concurrently, see ``djangular.core.concurrency``. Their results are merged into the
+    instances in the order of ``lookups``. Returns the instances.
+    """
+    branches = OrderedDict()
+    for lookup in lookups:
+        branches.setdefault(lookup.split('__')[0], []).append(lookup)
+    if not instances or len(branches) < 2:
+        prefetch_related_objects(instances, lookups)
+        return instances
+    results = run_concurrently(*[partial(_prefetch_branch, instances, branch) for branch in branches.values()])
+    for clones in results:
+        for instance, clone in zip(instances, clones):
+            for key, value in clone.__dict__.items():
+                if key == '_prefetched_objects_cache':
+                    instance.__dict__.setdefault(key, {}).update(value)
+                elif key not in instance.__dict__:
+                    instance.__dict__[key] = value
+    return instances
+
+
+def fetch_relations(queryset, relations, concurrent=False):
+    """
+    Evaluate the queryset and fetch everything required to serialize ``relations``, as
+    ``prefetch_relations`` does. If ``concurrent`` is set, the multi valued relations are fetched
+    concurrently. Returns a list of model instances.
+    """
+    if not concurrent:
+        return list(prefetch_relations(queryset, relations))
+    select, prefetch = get_related_lookups(queryset.model, relations or {})
+    if select:
+        queryset = queryset.select_related(*select)
+    return prefetch_concurrently(list(queryset), prefetch)
+
+
 class JSONResponseMixin(object):
     """
     A mixin that dispatches POST requests containing the keyword 'action' onto
     the method with that name. It renders the returned context as JSON response.
     """
     content_type = 'application/json'
+    instrument = None
+    instrumentation = NULL_INSTRUMENTATION
+    compress = None
+    compress_min_length = 1024
+    compress_level = 6
+    brotli_quality = 5
+    msgpack = None
+    # extras, which build_model_dict may look up on related objects
+    allowed_extras = ()
 
     def build_model_dict(self, obj, relations={}, fields=[]):
         """
@@ -36,51 +161,113 @@ class JSONResponseMixin(object):
             'milestone_groups': {},
         }
         """
-        if relations: relations = json.loads(relations)
+        if relations: relations = parse_relations(relations)
         else: relations = {}
 
-        if fields: fields = list(fields)
-        else: fields = []
-
-        serialized_data = serializers.serialize('json', [obj,], indent=4 if settings.DEBUG else 0,
-            relations=relations, fields=fields, flatten=True)
+        with self.instrumentation.phase('serialize'):
+            plan = get_serialization_plan(obj.__class__, relations, fields=fields or (),
+                                          allowed_extras=self.allowed_extras)
+            return [plan.serialize(obj)]
 
-        return json.loads(serialized_data)
+    def gather(self, *funcs):
+        """
+        Call several independent functions, such as queries, concurrently on a pool of threads
+        and return their results in the given order. Use this in allowed actions, which fetch
+        unrelated data sets.
+        """
+        return run_concurrently(*funcs)
 
-    def dispatch(self, *args, **kwargs):
-        return super(JSONResponseMixin, self).dispatch(*args, **kwargs)
+    def dispatch(self, request, *args, **kwargs):
+        if is_instrumented(self):
+            response = instrument_dispatch(self, super(JSONResponseMixin, self).dispatch, request, *args, **kwargs)
+        else:
+            response = super(JSONResponseMixin, self).dispatch(request, *args, **kwargs)
+        return compress_response(self, request, response)
 
     def get(self, request, *args, **kwargs):
         action = kwargs.get('action')
         action = action and getattr(self, action, None)
         if not callable(action):
             return self._dispatch_super(request, *args, **kwargs)
-        out_data = json.dumps(action(), cls=DjangoJSONEncoder)
+        out_data, content_type = self.call_action(request, action, dict(request.GET.items()))
         response = HttpResponse(out_data)
-        response['Content-Type'] = 'application/json;charset=UTF-8'
+        response['Content-Type'] = content_type
         response['Cache-Control'] = 'no-cache'
-        return response
+        return patch_vary_accept(self, response)
 
     def post(self, request, *args, **kwargs):
         try:
             if not request.is_ajax():
                 return self._dispatch_super(request, *args, **kwargs)
-            in_data = json.loads(request.body)
+            with self.instrumentation.phase('decode'):
+                in_data = decode_payload(self, request)
             action = in_data.pop('action', kwargs.get('action'))
             handler = action and getattr(self, action, None)
             if not callable(handler):
                 return self._dispatch_super(request, *args, **kwargs)
             if not hasattr(handler, 'is_allowed_action'):
                 raise ValueError('Method "%s" is not decorated with @allowed_action' % action)
-            out_data = json.dumps(handler(in_data), cls=DjangoJSONEncoder)
-            return HttpResponse(out_data, content_type='application/json;charset=UTF-8')
+            if getattr(handler, 'run_in_background', False):
+                return self.submit_action(request, handler, in_data)
+            out_data, content_type = self.call_action(request, handler, in_data, in_data)
+            return patch_vary_accept(self, HttpResponse(out_data, content_type=content_type))
         except ValueError as err:
             return HttpResponseBadRequest(err)
 
+    def call_action(self, request, action, cache_data, *args):
+        """
+        Call the action and return its encoded result and content type. If the action is cached,
+        ``cache_data`` is the payload used to build the cache key, and concurrent identical calls
+        missing the cache wait for one of them to compute the result.
+        """
+        def compute():
+            with self.instrumentation.phase('action'):
+                out_data = action(*args)
+            with self.instrumentation.phase('encode'):
+                return encode_payload(self, request, out_data)
+
+        action_cache = getattr(action, 'action_cache', None)
+        if action_cache is None:
+            return compute()
+        key = action_cache.get_cache_key(self, request, action, cache_data)
+
+        def compute_and_store():
+            # called only by the leader of the flight
+            result = compute()
+            cache.set(key, result, action_cache.timeout)
+            return result
+
+        result = cache.get(key)
+        if result is None:
+            result = single_flight(key, compute_and_store)
+        return result
+
+    def submit_action(self, request, action, in_data):
+        """
+        Submit the action as a background job and answer with its state and status 202. The
+        state of the job is available at the URL given in the Location header, to the user or
+        session submitting it.
+        """
+        session = getattr(request, 'session', None)
+        if session is not None and not session.session_key:
+            # anonymous clients need a session to query the state of their job
+            session.save()
+            session.modified = True
+        state = submit_job(partial(action, in_data), get_job_owner(request))
+        job = {'job': state['job'], 'status': state['status']}
+        try:
+            job['url'] = reverse('ng_job_status', kwargs={'job_id': state['job']})
+        except NoReverseMatch:
+            pass
+        out_data, content_type = encode_payload(self, request, job)
+        response = HttpResponse(out_data, content_type=content_type, status=202)
+        if 'url' in job:
+            response['Location'] = request.build_absolute_uri(job['url'])
+        return patch_vary_accept(self, response)
+
     def _dispatch_super(self, request, *args, **kwargs):
         base = super(JSONResponseMixin, self)
         handler = getattr(base, request.method.lower(), None)
-        print handler
         if callable(handler):
             return handler(request, *args, **kwargs)
         raise ValueError('This view can not handle method %s' % request.method)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Serialization of model instances into dictionaries, as returned by djangular's views. The
+``relations``, ``extras`` and ``fields`` requested by a client are compiled into a plan, which
+holds the field accessors and the plans of the nested relations. Plans are built once for each
+combination of model, relations, extras and fields, and kept in a bounded LRU cache, so that
+repeated requests skip the introspection of the models.
+
+A relations definition maps the names of relations onto their options::
+
+    {
+        'owner': {'fields': ('first_name', 'last_name', 'email')},
+        'milestones': {'excludes': ('done',), 'extras': ('is_overdue',)},
+        'members': {'relations': {'groups': {}}},
+    }
+
+Since these names come from the client, extras are only looked up if they are named in
+``allowed_extras``, and the fields listed in ``DJANGULAR_SENSITIVE_FIELDS`` (default
+``('password',)``) are never serialized.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import OneToOneField
+from django.db.models.fields import FieldDoesNotExist
+from django.utils.encoding import is_protected_type
+
+from djangular.core.lrucache import LRUCache
+
+_plans = LRUCache(256)
+_relations = LRUCache(256)
+
+
+def parse_relations(relations):
+    """
+    Return the relations definition encoded as JSON. The result is cached and must not be
+    modified. Raises ValueError if ``relations`` is not valid JSON.
+    """
+    parsed = _relations.get(relations)
+    if parsed is None:
+        parsed = json.loads(relations)
+        _relations.set(relations, parsed)
+    return parsed
+
+
+def get_relation(model, name):
+    """
+    Return a tuple containing the related model and a boolean telling whether the attribute
+    ``name`` of ``model`` refers to a single object. Return None if ``name`` is not a relation.
+    """
+    opts = model._meta
+    try:
+        field, _, direct, m2m = opts.get_field_by_name(name)
+        if direct and field.rel:
+            return field.rel.to, not m2m
+    except FieldDoesNotExist:
+        pass
+    # reverse relations are addressed by their accessor name
+    for related in opts.get_all_related_objects() + opts.get_all_related_many_to_many_objects():
+        if related.get_accessor_name() == name:
+            return related.model, isinstance(related.field, OneToOneField)
+    return None
+
+
+class SerializationPlan(object):
+    """
+    The compiled layout of the dictionary of an instance of ``model``.
+    """
+    def __init__(self, model, relations=None, extras=(), fields=(), excludes=(), allowed_extras=()):
+        relations = relations or {}
+        opts = model._meta
+        self.model = model
+        self.values = []
+        self.foreign_keys = []
+        self.many_to_many = []
+        self.nested = []
+        self.extras = [name for name in extras if name in allowed_extras and name not in relations]
+        sensitive_fields = getattr(settings, 'DJANGULAR_SENSITIVE_FIELDS', ('password',))
+
+        def is_serialized(name):
+            return (name not in relations and (not fields or name in fields) and name not in excludes
+                    and name not in sensitive_fields)
+
+        for field in opts.fields:
+            if not field.serialize or not is_serialized(field.name):
+                continue
+            if field.rel is None:
+                self.values.append((field.name, field))
+            else:
+                self.foreign_keys.append((field.name, field.attname))
+        for field in opts.many_to_many:
+            if field.serialize and field.rel.through._meta.auto_created and is_serialized(field.name):
+                self.many_to_many.append(field.name)
+        for name, options in sorted(relations.items()):
+            relation = get_relation(model, name)
+            if relation is None:
+                continue
+            related_model, single = relation
+            options = options if isinstance(options, dict) else {}
+            plan = get_serialization_plan(related_model, options.get('relations'), options.get('extras', ()),
+                                          options.get('fields', ()), options.get('excludes', ()), allowed_extras)
+            self.nested.append((name, single, plan))
+
+    def serialize(self, obj):
+        """
+        Return the dictionary of a single instance.
+        """
+        data = {'pk': obj.pk}
+        for name, field in self.values:
+            value = field._get_val_from_obj(obj)
+            data[name] = value if is_protected_type(value) else field.value_to_string(obj)
+        for name, attname in self.foreign_keys:
+            data[name] = getattr(obj, attname)
+        for name in self.many_to_many:
+            data[name] = [related.pk for related in getattr(obj, name).all()]
+        for name, single, plan in self.nested:
+            if single:
+                try:
+                    related = getattr(obj, name)
+                except ObjectDoesNotExist:
+                    related = None
+                data[name] = None if related is None else plan.serialize(related)
+            else:
+                data[name] = [plan.serialize(related) for related in getattr(obj, name).all()]
+        for name in self.extras:
+            value = getattr(obj, name, None)
+            data[name] = value() if callable(value) else value
+        return data
+
+
+def get_serialization_plan(model, relations=None, extras=(), fields=(), excludes=(), allowed_extras=()):
+    """
+    Return the cached serialization plan for ``model``, or compile it. Of the ``extras``, here
+    and in the nested relations, only those named in ``allowed_extras`` are looked up.
+    """
+    key = (model, json.dumps(relations or {}, sort_keys=True), tuple(extras), tuple(fields), tuple(excludes),
+           tuple(sorted(allowed_extras)))
+    plan = _plans.get(key)
+    if plan is None:
+        plan = SerializationPlan(model, relations, extras, fields, excludes, allowed_extras)
+        _plans.set(key, plan)
+    return plan
+
+
+def clear_serialization_plans():
+    _plans.clear()
+    _relations.clear()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag, parse_etags
+from django.views.generic import View
+
+from djangular.forms.template_cache import get_template_cache_bundle
+
+
+class NgTemplateCacheView(View):
+    """
+    Serve the bundle of forms preloading Angular's $templateCache. Since its URL contains the
+    version of the bundle, a response for the current version may be cached forever.
+    Requests for other versions are answered with the current bundle, but not cached.
+    """
+    cache_timeout = 86400 * 365
+
+    def get(self, request, version=None, *args, **kwargs):
+        content, current_version = get_template_cache_bundle()
+        if current_version in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/javascript;charset=UTF-8')
+        response['ETag'] = quote_etag(current_version)
+        if version == current_version:
+            patch_cache_control(response, public=True, max_age=self.cache_timeout)
+        else:
+            patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Accept-Language',))
+        return response
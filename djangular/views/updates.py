@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.utils.cache import patch_cache_control
+from django.views.generic import View
+
+from djangular.core.updates import get_sequence, get_updates_since
+from djangular.views.encoding import encode_payload, patch_vary_accept
+
+
+class NgUpdatesView(View):
+    """
+    Replay the updates of a facility, which a reconnecting websocket client missed. The client
+    passes the sequence number of the last update it received as ``since``, and receives the
+    current sequence number together with the missed ``updates``, or ``reset``, if they are not
+    kept anymore. Only the facilities permitted by ``has_permission`` can be replayed.
+    """
+    msgpack = None
+
+    def has_permission(self, request, facility):
+        """
+        Return True, if the client may replay the updates of ``facility``. By default, these are
+        the facilities listed in ``DJANGULAR_UPDATES_FACILITIES``. Override this method to check
+        the user, and include the view under your own URL.
+        """
+        return facility in getattr(settings, 'DJANGULAR_UPDATES_FACILITIES', ())
+
+    def get(self, request, facility=None, *args, **kwargs):
+        if not self.has_permission(request, facility):
+            return HttpResponseForbidden('Updates of this facility can not be replayed')
+        try:
+            since = int(request.GET.get('since', ''))
+        except ValueError:
+            return HttpResponseBadRequest('Parameter since must be a sequence number')
+        current = get_sequence(facility)
+        updates = get_updates_since(facility, since)
+        if updates is None:
+            out_data = {'seq': current, 'reset': True}
+        else:
+            out_data = {'seq': max([current] + [update['seq'] for update in updates]), 'updates': updates}
+        content, content_type = encode_payload(self, request, out_data)
+        response = HttpResponse(content, content_type=content_type)
+        patch_cache_control(response, no_cache=True)
+        return patch_vary_accept(self, response)
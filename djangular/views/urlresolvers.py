@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import json
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag, parse_etags
+from django.views.generic import View
+
+from djangular.core.urlresolvers import urls_by_namespace, url_templates_by_namespace
+
+
+class NgUrlsByNamespaceView(View):
+    """
+    Serve all URLs of a namespace, either as JSON object or as a Javascript file declaring the
+    AngularJS module ``ng.django.urls`` with the constant ``djangoUrls``. Add the namespace as
+    class attribute, or as keyword argument ``namespace`` to the urlconf entry. The response
+    carries an ETag and may be cached by the client for ``cache_timeout`` seconds.
+    If ``templates`` is set, URLs are rendered as templates with placeholders for their
+    parameters, for instance ``/api/project/:pk/``, usable by ``$resource``.
+    """
+    namespace = None
+    templates = False
+    format = 'json'
+    module_name = 'ng.django.urls'
+    constant_name = 'djangoUrls'
+    cache_timeout = 86400
+
+    def get_namespace(self):
+        namespace = self.kwargs.get('namespace', self.namespace)
+        if not namespace:
+            raise ImproperlyConfigured('%s requires the attribute namespace' % self.__class__.__name__)
+        return namespace
+
+    def get_urls(self):
+        if self.templates:
+            return url_templates_by_namespace(self.get_namespace())
+        return urls_by_namespace(self.get_namespace())
+
+    def render_content(self, urls):
+        """
+        Return a tuple containing the rendered content and its content type.
+        """
+        data = json.dumps(urls, sort_keys=True, separators=(',', ':'))
+        if self.kwargs.get('format', self.format) == 'js':
+            content = "angular.module('%s', []).constant('%s', %s);\n" % (self.module_name, self.constant_name, data)
+            return content, 'application/javascript;charset=UTF-8'
+        return data, 'application/json;charset=UTF-8'
+
+    def get(self, request, *args, **kwargs):
+        content, content_type = self.render_content(self.get_urls())
+        etag = hashlib.md5(content.encode('utf-8')).hexdigest()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, public=True, max_age=self.cache_timeout)
+        return response
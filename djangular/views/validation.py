@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_text
+from django.utils.http import quote_etag, parse_etags
+from django.utils.translation import get_language
+from django.views.generic import View
+
+from djangular.forms.validation_schema import form_validation_schema
+from djangular.views.mixins import JSONResponseMixin, allowed_action
+
+# Serialized schemas, keyed by form class and language. Form classes do not change at runtime,
+# therefore this cache never has to be invalidated.
+_schema_cache = {}
+
+
+class NgFormSchemaView(View):
+    """
+    Serve the validation rules of ``form_class`` as JSON, so that an AngularJS application can
+    fetch them once and build its forms on the client. The response carries an ETag and
+    long-lived caching headers; revalidating clients receive a 304 response.
+    """
+    form_class = None
+    cache_timeout = 86400 * 30
+
+    def get_form_class(self):
+        if self.form_class is None:
+            raise ImproperlyConfigured('%s requires the attribute form_class' % self.__class__.__name__)
+        return self.form_class
+
+    def get_schema(self):
+        """
+        Return a tuple containing the JSON encoded schema and its ETag.
+        """
+        key = (self.get_form_class(), get_language())
+        if key not in _schema_cache:
+            content = json.dumps(form_validation_schema(key[0]), cls=DjangoJSONEncoder, separators=(',', ':'))
+            _schema_cache[key] = (content, hashlib.md5(content.encode('utf-8')).hexdigest())
+        return _schema_cache[key]
+
+    def get(self, request, *args, **kwargs):
+        content, etag = self.get_schema()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json;charset=UTF-8')
+        response['ETag'] = quote_etag(etag)
+        patch_cache_control(response, public=True, max_age=self.cache_timeout)
+        patch_vary_headers(response, ('Accept-Language',))
+        return response
+
+
+class NgFieldValidationView(JSONResponseMixin, View):
+    """
+    Validate a few fields of ``form_class`` on the server, while the user is typing. The client
+    posts ``{action: 'validate_fields', fields: ['email'], data: {...}}`` and receives the errors
+    of those fields only, keyed the same way ``NgModelFormMixin.full_clean`` keys them. The form
+    class must inherit from ``NgModelFormMixin``.
+    """
+    form_class = None
+
+    def get_form_class(self):
+        if self.form_class is None:
+            raise ImproperlyConfigured('%s requires the attribute form_class' % self.__class__.__name__)
+        return self.form_class
+
+    def get_form_kwargs(self, data):
+        """
+        Override this to pass further arguments, such as ``prefix`` or ``instance`` to the form.
+        """
+        return {'data': data}
+
+    @allowed_action
+    def validate_fields(self, in_data):
+        data = in_data.get('data', {})
+        if not isinstance(data, dict):
+            raise ValueError('Attribute data must be an object')
+        field_names = in_data.get('fields') or data.keys()
+        if not isinstance(field_names, list) or not all(isinstance(name, basestring) for name in field_names):
+            raise ValueError('Attribute fields must be a list of field names')
+        form = self.get_form_class()(**self.get_form_kwargs(data))
+        errors = form.partial_clean(field_names)
+        return {'errors': dict((key, [force_text(msg) for msg in msgs]) for key, msgs in errors.items())}
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the request hot paths of djangular against a freshly created SQLite test database,
+filled with generated fixtures. Run it from the directory ``examples``::
+
+    ./manage.py benchmark --save-baseline
+    # apply your changes
+    ./manage.py benchmark
+
+The second run compares its results against the stored baseline and fails if a case became
+slower than the given tolerance, or if it issues more queries than before.
+"""
+import gc
+import json
+import os
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.conf.urls import url, patterns, include
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.views.generic import View
+
+from djangular.core.urlresolvers import urls_by_namespace
+from djangular.forms.angular_base import BaseCrudForm
+from djangular.views.auth import NgLoggedInUserView
+from djangular.views.crud import NgCRUDView
+from djangular.views.mixins import JSONResponseMixin, allowed_action
+from server.forms import SubscriptionForm, SubscriptionFormWithNgModel
+from server.models import Project, Milestone
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'benchmark-baseline.json')
+
+
+class ProjectForm(BaseCrudForm):
+    class Meta:
+        model = Project
+        fields = ('name', 'owner', 'budget')
+
+
+class ProjectCRUDView(NgCRUDView):
+    model_class = Project
+    create_form_class = ProjectForm
+
+
+class ActionView(JSONResponseMixin, View):
+    @allowed_action
+    def echo(self, in_data):
+        return {'success': True, 'data': in_data}
+
+
+def dummy_view(request, *args, **kwargs):
+    return HttpResponse('OK')
+
+
+api_patterns = patterns('',
+    url(r'^projects/$', dummy_view, name='project_list'),
+    url(r'^milestones/$', dummy_view, name='milestone_list'),
+    url(r'^users/$', dummy_view, name='user_list'),
+)
+
+urlpatterns = patterns('',
+    url(r'^api/', include(api_patterns, namespace='api')),
+)
+
+
+class Case(object):
+    """
+    A benchmarked operation. ``prepare`` runs outside of the measurement and returns a callable,
+    which performs exactly one request.
+    """
+    def __init__(self, name, prepare):
+        self.name = name
+        self.prepare = prepare
+
+
+def percentile(timings, fraction):
+    timings = sorted(timings)
+    return timings[min(len(timings) - 1, int(round(fraction * (len(timings) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the request hot paths of djangular.'
+    option_list = BaseCommand.option_list + (
+        make_option('--iterations', type='int', default=200,
+            help='Number of measured requests per case.'),
+        make_option('--rows', type='int', default=100,
+            help='Number of generated projects.'),
+        make_option('--baseline', default=DEFAULT_BASELINE,
+            help='Path of the JSON file holding the baseline.'),
+        make_option('--save-baseline', action='store_true', default=False,
+            help='Store the results as the new baseline.'),
+        make_option('--tolerance', type='float', default=0.2,
+            help='Accepted slowdown of the median latency against the baseline.'),
+        make_option('--case', action='append', dest='cases', default=[],
+            help='Run only the named case. May be given more than once.'),
+    )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1:
+            raise CommandError('Option --rows must be at least 1')
+        # measure the production configuration, without the debug cursor
+        settings.DEBUG = False
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            self.create_fixtures(options['rows'])
+            results = self.run_cases(options['iterations'], options['cases'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.report(results)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+            self.stdout.write('Baseline stored in %s' % options['baseline'])
+        elif os.path.exists(options['baseline']):
+            with open(options['baseline']) as fh:
+                self.compare(results, json.load(fh), options['tolerance'], options['cases'])
+
+    def create_fixtures(self, rows):
+        # each project has three distinct members
+        users = [User(username='user%d' % i, email='user%d@example.com' % i) for i in range(max(rows // 5, 3))]
+        User.objects.bulk_create(users)
+        users = list(User.objects.all())
+        Project.objects.bulk_create([Project(name='Project %d' % i, owner=users[i % len(users)], budget=i)
+                                     for i in range(rows)])
+        projects = list(Project.objects.all())
+        Milestone.objects.bulk_create([Milestone(project=project, title='Milestone %d' % i)
+                                       for project in projects for i in range(5)])
+        through = Project.members.through
+        through.objects.bulk_create([through(project=project, user=users[(project.pk + i) % len(users)])
+                                     for project in projects for i in range(3)])
+        self.user = users[0]
+        self.project = projects[0]
+
+    def get_cases(self):
+        factory = RequestFactory()
+        crud_view = ProjectCRUDView.as_view()
+        action_view = ActionView.as_view()
+        user_view = NgLoggedInUserView.as_view()
+
+        def crud_query():
+            request = factory.get('/crud/')
+            return lambda: crud_view(request)
+
+        def crud_get():
+            request = factory.get('/crud/')
+            return lambda: crud_view(request, pk=self.project.pk)
+
+        def crud_save():
+            data = json.dumps({'name': 'New project', 'owner': self.user.pk, 'budget': '10.00'})
+            request = factory.post('/crud/', data=data, content_type='application/json')
+            return lambda: crud_view(request)
+
+        def crud_update():
+            request = factory.generic('PATCH', '/crud/?name=Renamed&budget=12.50')
+            return lambda: crud_view(request, pk=self.project.pk)
+
+        def crud_delete():
+            obj = Project.objects.create(name='Doomed', owner=self.user)
+            request = factory.delete('/crud/')
+            return lambda: crud_view(request, pk=obj.pk)
+
+        def action_dispatch():
+            data = json.dumps({'action': 'echo', 'foo': 'bar', 'values': range(20)})
+            request = factory.post('/action/', data=data, content_type='application/json',
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            return lambda: action_view(request)
+
+        def logged_in_user():
+            request = factory.get('/logged-in-user/')
+            request.user = self.user
+            return lambda: user_view(request, action='get_data')
+
+        def form_validation_render():
+            return lambda: unicode(SubscriptionForm(form_name='subscribe_form'))
+
+        def model_form_render():
+            return lambda: unicode(SubscriptionFormWithNgModel(scope_prefix='subscribe_data'))
+
+        def namespace_urls():
+            return lambda: urls_by_namespace('api', urlconf=__name__)
+
+        return [
+            Case('crud_query', crud_query),
+            Case('crud_get', crud_get),
+            Case('crud_save', crud_save),
+            Case('crud_update', crud_update),
+            Case('crud_delete', crud_delete),
+            Case('action_dispatch', action_dispatch),
+            Case('logged_in_user', logged_in_user),
+            Case('form_validation_render', form_validation_render),
+            Case('model_form_render', model_form_render),
+            Case('urls_by_namespace', namespace_urls),
+        ]
+
+    def measure(self, case, iterations):
+        # warm up caches, and find out if this case works at all
+        for _ in range(min(iterations, 5)):
+            case.prepare()()
+        perform = case.prepare()
+        with CaptureQueriesContext(connection) as queries:
+            perform()
+        num_queries = len(queries)
+        reset_queries()
+        timings, allocations = [], []
+        for _ in range(iterations):
+            perform = case.prepare()
+            gc.collect()
+            gc.disable()
+            try:
+                allocated = gc.get_count()[0]
+                start = time.time()
+                perform()
+                timings.append(time.time() - start)
+                allocations.append(gc.get_count()[0] - allocated)
+            finally:
+                gc.enable()
+        return {
+            'rps': iterations / sum(timings) if sum(timings) else 0,
+            'p50': percentile(timings, 0.5) * 1000,
+            'p99': percentile(timings, 0.99) * 1000,
+            'queries': num_queries,
+            'allocations': sum(allocations) // iterations,
+        }
+
+    def run_cases(self, iterations, selected):
+        results = {}
+        for case in self.get_cases():
+            if selected and case.name not in selected:
+                continue
+            try:
+                results[case.name] = self.measure(case, iterations)
+            except Exception as err:
+                results[case.name] = {'error': '%s: %s' % (err.__class__.__name__, err)}
+        return results
+
+    def report(self, results):
+        self.stdout.write('%-24s %10s %10s %10s %8s %12s' % ('case', 'req/s', 'p50 ms', 'p99 ms', 'queries', 'allocations'))
+        for name, result in sorted(results.items()):
+            if 'error' in result:
+                self.stdout.write('%-24s failed: %s' % (name, result['error']))
+            else:
+                self.stdout.write('%-24s %10.1f %10.3f %10.3f %8d %12d' % (name, result['rps'],
+                    result['p50'], result['p99'], result['queries'], result['allocations']))
+
+    def compare(self, results, baseline, tolerance, selected=()):
+        regressions = []
+        for name, reference in sorted(baseline.items()):
+            if 'error' in reference or selected and name not in selected:
+                continue
+            result = results.get(name)
+            if result is None:
+                regressions.append('%s: missing, but present in the baseline' % name)
+                continue
+            if 'error' in result:
+                regressions.append('%s: failed with %s' % (name, result['error']))
+                continue
+            if result['p50'] > reference['p50'] * (1 + tolerance):
+                regressions.append('%s: median latency %.3fms, baseline %.3fms' % (name, result['p50'], reference['p50']))
+            if result['queries'] > reference['queries']:
+                regressions.append('%s: %d queries, baseline %d' % (name, result['queries'], reference['queries']))
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write('No regressions against the baseline.')
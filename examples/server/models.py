@@ -1,5 +1,33 @@
 # -*- coding: utf-8 -*-
 from django.db import models
+from django.contrib.auth.models import User
 
 class DummyModel(models.Model):
-    name = models.CharField(max_length=255)
\ No newline at end of file
+    name = models.CharField(max_length=255)
+
+
+class RequestSaveModel(models.Model):
+    """
+    NgCRUDView passes the request to the model's save method.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        kwargs.pop('request', None)
+        super(RequestSaveModel, self).save(*args, **kwargs)
+
+
+class Project(RequestSaveModel):
+    name = models.CharField(max_length=255)
+    owner = models.ForeignKey(User, related_name='owned_projects')
+    members = models.ManyToManyField(User, related_name='projects', blank=True)
+    budget = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class Milestone(RequestSaveModel):
+    project = models.ForeignKey(Project, related_name='milestones')
+    title = models.CharField(max_length=255)
+    due_date = models.DateField(null=True, blank=True)
+    done = models.BooleanField(default=False)
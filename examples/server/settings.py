@@ -6,6 +6,14 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'test.sqlite',
+        # a file, rather than in memory, so that the threads of djangular's pool see the test data
+        'TEST_NAME': 'test_default.sqlite',
+    },
+    # a second database, used by the tests of the read replica routing in NgCRUDView
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'replica.sqlite',
+        'TEST_NAME': 'test_replica.sqlite',
     },
 }
 
@@ -90,6 +98,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'djangular': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': True,
+        },
     },
 }
 
@@ -3,3 +3,4 @@ from forms import *
 from views import *
 from validation import *
 from templatetags import *
+from urlresolvers import *
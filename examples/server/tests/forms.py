@@ -1,11 +1,16 @@
 # -*- coding: utf-8 -*-
 import copy
+import json
 from django.db import models
 from django import forms
 from django.test import TestCase
-from djangular.forms import NgModelFormMixin, AddPlaceholderFormMixin
+from django.test.client import RequestFactory
+from django.contrib.auth.models import User
+from djangular.forms import NgModelFormMixin, NgModelFormSet, AddPlaceholderFormMixin
+from djangular.views.validation import NgFieldValidationView
 from pyquery.pyquery import PyQuery
 from lxml import html
+from server.models import Project
 
 
 CHOICES = (('a', 'Choice A'), ('b', 'Choice B'), ('c', 'Choice C'))
@@ -161,6 +166,138 @@ class InvalidNgModelFormMixinTest(TestCase):
         self.assertRaises(TypeError, InvalidForm)
 
 
+class PasswordForm(NgModelFormMixin, forms.Form):
+    email = forms.EmailField(label='E-Mail')
+    password = forms.CharField(min_length=6)
+    password2 = forms.CharField()
+
+    class Meta:
+        ng_dependencies = {'password2': ['password']}
+
+    def clean_password2(self):
+        if self.cleaned_data.get('password') != self.cleaned_data['password2']:
+            raise forms.ValidationError('Passwords do not match')
+        return self.cleaned_data['password2']
+
+
+class PartialCleanTest(TestCase):
+    def test_only_named_fields(self):
+        form = PasswordForm(data={'email': 'no.email.address', 'password': 'abc'})
+        errors = form.partial_clean(['password'])
+        self.assertListEqual(errors.keys(), ['password'])
+
+    def test_dependencies(self):
+        form = PasswordForm(data={'password': 'secret', 'password2': 'other'})
+        errors = form.partial_clean(['password2'])
+        self.assertListEqual(list(errors['password2']), ['Passwords do not match'])
+        form = PasswordForm(data={'password': 'secret', 'password2': 'secret'})
+        self.assertFalse(form.partial_clean(['password2']))
+
+    def test_prefixed_keys(self):
+        form = SubForm1(prefix='sub1', data={'sub1': {'select_choices': 'X', 'radio_choices': 'a'}})
+        errors = form.partial_clean(['select_choices', 'radio_choices'])
+        self.assertListEqual(errors.keys(), ['sub1.select_choices'])
+
+    def test_unknown_field(self):
+        form = PasswordForm(data={})
+        self.assertRaises(ValueError, form.partial_clean, ['nonexistent'])
+
+    def test_validation_view(self):
+        in_data = {'action': 'validate_fields', 'fields': ['email'], 'data': {'email': 'john@'}}
+        request = RequestFactory().post('/validate.json', data=json.dumps(in_data),
+            content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        response = NgFieldValidationView.as_view(form_class=PasswordForm)(request)
+        out_data = json.loads(response.content)
+        self.assertListEqual(out_data['errors'].keys(), ['email'])
+
+    def test_validation_view_bad_request(self):
+        for in_data in ({'data': [1]}, {'data': 'x'}, {'fields': [1], 'data': {}}, {'fields': 'email', 'data': {}}):
+            in_data['action'] = 'validate_fields'
+            request = RequestFactory().post('/validate.json', data=json.dumps(in_data),
+                content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            response = NgFieldValidationView.as_view(form_class=PasswordForm)(request)
+            self.assertEqual(response.status_code, 400)
+
+
+class RowForm(NgModelFormMixin, forms.Form):
+    email = forms.EmailField(label='E-Mail')
+    weight = forms.IntegerField(min_value=42, label='Weight')
+
+
+class RowFormSet(NgModelFormSet):
+    form_class = RowForm
+
+    def clean(self):
+        emails = [data['email'] for data in self.cleaned_data if data]
+        if len(emails) != len(set(emails)):
+            raise forms.ValidationError('E-Mail addresses must be unique')
+
+
+class ProjectRowForm(NgModelFormMixin, forms.ModelForm):
+    class Meta:
+        model = Project
+        fields = ('name', 'owner', 'budget')
+
+
+class ProjectFormSet(NgModelFormSet):
+    form_class = ProjectRowForm
+    prefix = 'projects'
+
+
+class NgModelFormSetTest(TestCase):
+    def test_rows(self):
+        formset = RowFormSet(initial=[{'email': 'john@example.com'}] * 3, scope_prefix='grid')
+        self.assertEqual(len(formset), 3)
+        dom = PyQuery(formset.as_table())
+        self.assertEqual(len(dom('tr')), 4)
+        for index in range(3):
+            element = dom('input[name="rows[%d].weight"]' % index)
+            self.assertEqual(element.attr('ng-model'), 'grid.rows[%d].weight' % index)
+            self.assertEqual(element.attr('id'), 'id_rows[%d].weight' % index)
+        self.assertListEqual(formset.get_initial_data(), [{'email': 'john@example.com'}] * 3)
+
+    def test_markup_is_rendered_once(self):
+        formset = RowFormSet(initial=[{}] * 10)
+        markup = [list(row) for row in formset]
+        self.assertIs(formset.field_templates, formset.field_templates)
+        self.assertIn('name="rows[9].email"', markup[9][0])
+        self.assertNotIn('__index__', ''.join(sum(markup, [])))
+
+    def test_bulk_validation(self):
+        data = {'rows': [
+            {'email': 'john@example.com', 'weight': 70},
+            {'email': 'no.email.address', 'weight': 70},
+            {'email': 'mary@example.com', 'weight': 12},
+        ]}
+        formset = RowFormSet(data=data)
+        self.assertFalse(formset.is_valid())
+        self.assertListEqual(sorted(formset.errors.keys()), ['rows[1].email', 'rows[2].weight'])
+        self.assertEqual(formset.cleaned_data[0], {'email': 'john@example.com', 'weight': 70})
+        self.assertIsNone(formset.cleaned_data[1])
+
+    def test_clean(self):
+        data = [{'email': 'john@example.com', 'weight': 70}] * 2
+        formset = RowFormSet(data=data)
+        self.assertFalse(formset.is_valid())
+        self.assertListEqual(list(formset.errors['__all__']), ['E-Mail addresses must be unique'])
+        self.assertRaises(ValueError, RowFormSet, data={'rows': {'email': 'john@example.com'}})
+
+    def test_save(self):
+        owner = User.objects.create(username='john')
+        project = Project.objects.create(name='Apollo', owner=owner)
+        data = {'projects': [
+            {'name': 'Gemini', 'owner': owner.pk, 'budget': '10.00'},
+            {'name': 'Mercury', 'owner': owner.pk, 'budget': '20.00'},
+        ]}
+        formset = ProjectFormSet(data=data, instances=[project])
+        self.assertTrue(formset.is_valid())
+        instances = formset.save()
+        self.assertEqual(instances[0].pk, project.pk)
+        self.assertListEqual(sorted(Project.objects.values_list('name', flat=True)), ['Gemini', 'Mercury'])
+        formset = ProjectFormSet(instances=Project.objects.order_by('pk'))
+        self.assertEqual(formset.get_initial_data()[1]['name'], 'Mercury')
+
+
 class AddPlaceholderFormMixinTest(TestCase):
     class EmailOnlyForm(AddPlaceholderFormMixin, forms.Form):
         email = forms.EmailField(label='E-Mail')
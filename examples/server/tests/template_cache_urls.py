@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Forms registered while the urlconf is imported, as recommended for ``register_form_template``.
+"""
+from django.conf.urls import patterns, url, include
+from djangular.forms.template_cache import register_form_template
+from server.forms import SubscriptionFormWithNgModel
+
+register_form_template('forms/subscribe.html', SubscriptionFormWithNgModel, scope_prefix='subscribe_data')
+
+urlpatterns = patterns('',
+    url(r'^djangular/', include('djangular.urls')),
+)
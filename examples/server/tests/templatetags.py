@@ -1,7 +1,38 @@
 # -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import sys
+import tempfile
+from django.conf.urls import patterns, url, include
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.urlresolvers import clear_url_caches
+from django.http import HttpResponseForbidden
 from django.test import TestCase
-from django.test.client import Client
-from django.template import RequestContext, Template
+from django.test.client import Client, RequestFactory
+from django.template import RequestContext, Template, TemplateSyntaxError
+from djangular.forms.template_cache import _bundles, form_templates, register_form_template, get_template_cache_bundle
+from djangular.templatetags.djangular_tags import json_for_script
+from djangular.views.crud import NgCRUDView
+from server.forms import SubscriptionFormWithNgModel
+from server.models import Project
+
+urlpatterns = patterns('',
+    url(r'^djangular/', include('djangular.urls')),
+)
+
+
+class BootstrapProjectCRUDView(NgCRUDView):
+    model_class = Project
+    relations = {'owner': {'fields': ['username']}}
+
+
+class StaffProjectCRUDView(BootstrapProjectCRUDView):
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return HttpResponseForbidden()
+        return super(StaffProjectCRUDView, self).dispatch(request, *args, **kwargs)
 
 
 class TemplateTagsTest(TestCase):
@@ -13,3 +44,121 @@ class TemplateTagsTest(TestCase):
         context = RequestContext(request, {'csrf_token': '123'})
         response = template.render(context)
         self.assertInHTML(response, 'x=""')
+
+    def test_json_for_script(self):
+        self.assertEqual(json_for_script({'html': u'</script><b>&\u2028'}),
+                         u'{"html": "\\u003c/script\\u003e\\u003cb\\u003e\\u0026\\u2028"}')
+
+
+class BootstrapTagTest(TestCase):
+    urls = 'server.tests.urlresolvers'
+
+    def test_bootstrap(self):
+        owner = User.objects.create(username='owner</script>')
+        owner.set_password('secret')
+        owner.save()
+        Project.objects.create(name='Project', owner=owner)
+        request = RequestFactory().get('/', {'name': 'Other', 'relations': '{"groups": {}}', 'fields': 'password'})
+        request.user = owner
+        template = Template("{% load djangular_tags %}{% djng_bootstrap user=True urls='api' "
+                            "projects='server.tests.templatetags.BootstrapProjectCRUDView' %}")
+        html = template.render(RequestContext(request, {'request': request}))
+        self.assertTrue(html.startswith('<script type="application/json" id="djng-bootstrap">'))
+        self.assertNotIn('</script><', html)
+        data = json.loads(html[html.index('>') + 1:-len('</script>')])
+        self.assertEqual(data['user']['username'], 'owner</script>')
+        self.assertNotIn('password', data['user'])
+        self.assertNotIn('groups', data['user'])
+        self.assertEqual(data['urls'], {'project_list': '/api/projects/', 'user_list': '/api/users/'})
+        self.assertEqual(len(data['projects']), 1)
+        self.assertEqual(data['projects'][0]['owner'], {'pk': owner.pk, 'username': 'owner</script>'})
+
+    def test_user_fields(self):
+        user = User.objects.create(username='john', email='john@example.com')
+        request = RequestFactory().get('/')
+        request.user = user
+        template = Template("{% load djangular_tags %}{% djng_bootstrap user=True user_fields='username,password' "
+                            "user_relations='{\"groups\": {}}' %}")
+        html = template.render(RequestContext(request, {'request': request}))
+        data = json.loads(html[html.index('>') + 1:-len('</script>')])
+        self.assertEqual(data['user'], {'pk': user.pk, 'username': 'john', 'groups': []})
+
+    def test_permission_denied(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.create(username='john')
+        template = Template("{% load djangular_tags %}{% djng_bootstrap "
+                            "projects='server.tests.templatetags.StaffProjectCRUDView' %}")
+        html = template.render(RequestContext(request, {'request': request}))
+        self.assertEqual(json.loads(html[html.index('>') + 1:-len('</script>')]), {})
+
+    def test_syntax(self):
+        self.assertRaises(TemplateSyntaxError, Template, '{% load djangular_tags %}{% djng_bootstrap %}')
+
+
+class TemplateCacheTest(TestCase):
+    urls = 'server.tests.templatetags'
+
+    def setUp(self):
+        register_form_template('forms/subscribe.html', SubscriptionFormWithNgModel, scope_prefix='subscribe_data')
+
+    def tearDown(self):
+        form_templates.clear()
+        _bundles.clear()
+
+    def test_bundle(self):
+        content, version = get_template_cache_bundle()
+        self.assertTrue(content.startswith("angular.module('ng.django.forms.templates', [])"))
+        self.assertIn('$templateCache.put("forms/subscribe.html", ', content)
+        self.assertIn('ng-model=\\"subscribe_data.first_name\\"', content)
+        self.assertEqual(get_template_cache_bundle(), (content, version))
+
+    def test_view(self):
+        version = get_template_cache_bundle()[1]
+        html = Template('{% load djangular_tags %}{% djng_template_cache %}').render(RequestContext(RequestFactory().get('/')))
+        self.assertEqual(html, '<script src="/djangular/templates/%s.js"></script>' % version)
+        response = self.client.get('/djangular/templates/%s.js' % version)
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+        self.assertIn('$templateCache.put', response.content)
+        response = self.client.get('/djangular/templates/outdated.js')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        response = self.client.get('/djangular/templates/%s.js' % version, HTTP_IF_NONE_MATCH='"%s"' % version)
+        self.assertEqual(response.status_code, 304)
+
+    def test_command(self):
+        output = tempfile.mkdtemp()
+        try:
+            call_command('djng_templatecache', output=output, stdout=open(os.devnull, 'w'))
+            version = get_template_cache_bundle()[1]
+            with open(os.path.join(output, 'templates.%s.js' % version)) as fh:
+                self.assertEqual(fh.read().decode('utf-8'), get_template_cache_bundle()[0])
+        finally:
+            shutil.rmtree(output)
+
+
+class TemplateCacheCommandTest(TestCase):
+    urls = 'server.tests.template_cache_urls'
+
+    def setUp(self):
+        # register the forms again, while the command imports the urlconf
+        sys.modules.pop('server.tests.template_cache_urls', None)
+        clear_url_caches()
+        form_templates.clear()
+        _bundles.clear()
+
+    def tearDown(self):
+        form_templates.clear()
+        _bundles.clear()
+
+    def test_urlconf_registrations(self):
+        output = tempfile.mkdtemp()
+        try:
+            with self.settings(STATIC_ROOT=output, STATIC_URL='/static/'):
+                call_command('djng_templatecache', stdout=open(os.devnull, 'w'))
+                _bundles.clear()
+                html = Template('{% load djangular_tags %}{% djng_template_cache static=True %}').render(
+                    RequestContext(RequestFactory().get('/')))
+            filename = html[len('<script src="/static/djangular/'):-len('"></script>')]
+            with open(os.path.join(output, 'djangular', filename)) as fh:
+                self.assertIn('$templateCache.put("forms/subscribe.html", ', fh.read())
+        finally:
+            shutil.rmtree(output)
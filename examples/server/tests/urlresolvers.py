@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+from django.conf.urls import url, patterns, include
+from django.core.urlresolvers import clear_url_caches, get_resolver
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from djangular.core import urlresolvers
+from djangular.core.urlresolvers import urls_by_namespace, url_templates_by_namespace
+from djangular.views.urlresolvers import NgUrlsByNamespaceView
+
+
+def dummy_view(request, *args, **kwargs):
+    return HttpResponse('OK')
+
+
+api_patterns = patterns('',
+    url(r'^projects/$', dummy_view, name='project_list'),
+    url(r'^users/$', dummy_view, name='user_list'),
+)
+
+detail_patterns = patterns('',
+    url(r'^project/(?P<pk>\d+)/$', dummy_view, name='project_detail'),
+    url(r'^project/(?P<pk>\d+)/member/(?P<slug>[\w-]+)/$', dummy_view, name='project_member'),
+    url(r'^archive/(\d{4})/$', dummy_view, name='archive'),
+)
+
+urlpatterns = patterns('',
+    url(r'^api/', include(api_patterns, namespace='api')),
+    url(r'^detail/', include(detail_patterns, namespace='detail')),
+)
+
+
+class UrlsByNamespaceTest(TestCase):
+    urls = 'server.tests.urlresolvers'
+
+    def test_urls_by_namespace(self):
+        urls = urls_by_namespace('api')
+        self.assertDictEqual(urls, {'project_list': '/api/projects/', 'user_list': '/api/users/'})
+
+    def test_memoized_per_resolver(self):
+        urls_by_namespace('api')
+        self.assertEqual(len(urlresolvers._urls_cache[get_resolver(None)]), 1)
+        urls = urls_by_namespace('api')
+        urls['project_list'] = 'modified'
+        self.assertEqual(urls_by_namespace('api')['project_list'], '/api/projects/')
+        clear_url_caches()
+        self.assertEqual(urls_by_namespace('api', prefix='/app/')['user_list'], '/app/api/users/')
+
+    def test_invalid_namespace(self):
+        self.assertRaises(AttributeError, urls_by_namespace, None)
+
+    def test_view_as_javascript(self):
+        request = RequestFactory().get('/urls.js')
+        response = NgUrlsByNamespaceView.as_view(namespace='api')(request, format='js')
+        self.assertTrue(response.content.startswith("angular.module('ng.django.urls', [])"))
+        self.assertEqual(response['Content-Type'], 'application/javascript;charset=UTF-8')
+
+    def test_view_etag(self):
+        view = NgUrlsByNamespaceView.as_view(namespace='api')
+        response = view(RequestFactory().get('/urls.json'))
+        self.assertEqual(json.loads(response.content)['user_list'], '/api/users/')
+        response = view(RequestFactory().get('/urls.json', HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(response.status_code, 304)
+
+
+class UrlTemplatesByNamespaceTest(TestCase):
+    urls = 'server.tests.urlresolvers'
+
+    def test_url_templates(self):
+        templates = url_templates_by_namespace('detail')
+        self.assertDictEqual(templates, {
+            'project_detail': '/detail/project/:pk/',
+            'project_member': '/detail/project/:pk/member/:slug/',
+            'archive': '/detail/archive/:_0/',
+        })
+
+    def test_view_with_templates(self):
+        request = RequestFactory().get('/urls.json')
+        response = NgUrlsByNamespaceView.as_view(namespace='detail', templates=True)(request)
+        self.assertEqual(json.loads(response.content)['project_detail'], '/detail/project/:pk/')
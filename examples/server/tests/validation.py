@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
+import json
+import re
 import django
 from django.test import TestCase
+from django.test.client import RequestFactory
 from pyquery.pyquery import PyQuery
+from djangular.forms.js_regex import translate_regex, js_regex_literal, check_regex_fields, UntranslatableRegex
+from djangular.forms.validation_schema import form_validation_schema
+from djangular.views.validation import NgFormSchemaView
 from server.forms import SubscriptionForm, SubscriptionFormWithNgModel
 
 
@@ -77,3 +83,56 @@ class NgFormValidationWithModelMixinTest(TestCase):
             self.assertDictContainsSubset({'min': '1.48'}, attrib)
             self.assertDictContainsSubset({'max': '1.95'}, attrib)
         self.assertDictContainsSubset({'ng-model': 'subscribe_data.height'}, attrib)
+
+
+class NgFormSchemaTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_schema(self):
+        schema = form_validation_schema(SubscriptionForm)
+        fields = dict((rules['name'], rules) for rules in schema['fields'])
+        self.assertEqual(schema['fields'][0]['name'], 'first_name')
+        self.assertDictContainsSubset({'required': True, 'minlength': 3, 'maxlength': 20}, fields['first_name'])
+        self.assertEqual(fields['last_name']['pattern'], '/^[A-Z][a-z -]+/')
+        self.assertEqual(fields['last_name']['errors']['pattern'], 'Last names shall start in upper case')
+        self.assertDictContainsSubset({'min': 42, 'max': 95}, fields['weight'])
+        self.assertEqual(fields['weight']['errors']['min'], 'You are too lightweight')
+        self.assertIn('required', fields['email']['errors'])
+
+    def test_schema_leaves_form_untouched(self):
+        form_validation_schema(SubscriptionForm)
+        self.assertNotIn('ng-pattern', SubscriptionForm.base_fields['last_name'].widget.attrs)
+
+    def test_schema_view_etag(self):
+        view = NgFormSchemaView.as_view(form_class=SubscriptionForm)
+        response = view(self.factory.get('/schema.json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['form'], 'SubscriptionForm')
+        self.assertIn('max-age', response['Cache-Control'])
+        response = view(self.factory.get('/schema.json', HTTP_IF_NONE_MATCH=response['ETag']))
+        self.assertEqual(response.status_code, 304)
+
+
+class JsRegexTest(TestCase):
+    def test_anchors_and_slashes(self):
+        self.assertEqual(translate_regex(r'\Ahttp://\w+\Z'), (r'^http:\/\/\w+$', ''))
+
+    def test_named_groups(self):
+        self.assertEqual(translate_regex(r'(?P<quote>[\'"]).*(?P=quote)'), (r'([\'"]).*(?:\1)', ''))
+
+    def test_flags(self):
+        self.assertEqual(translate_regex(r'(?i)^abc.$'), ('^abc.$', 'i'))
+        self.assertEqual(translate_regex(re.compile(r'a.b', re.DOTALL)), (r'a[\s\S]b', ''))
+        self.assertEqual(translate_regex(re.compile(r'a b # comment', re.VERBOSE)), ('ab', ''))
+
+    def test_character_classes(self):
+        self.assertEqual(translate_regex(r'[]a/]'), (r'[\]a\/]', ''))
+        self.assertEqual(translate_regex(r'[^]a]'), (r'[^\]a]', ''))
+
+    def test_untranslatable(self):
+        self.assertRaises(UntranslatableRegex, translate_regex, r'(?<=a)b')
+        self.assertIsNone(js_regex_literal(re.compile(r'(?<!a)b')))
+
+    def test_check_regex_fields(self):
+        self.assertListEqual(check_regex_fields(SubscriptionForm), [])
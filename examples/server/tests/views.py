@@ -1,11 +1,35 @@
 # -*- coding: utf-8 -*-
 import json
-from django.test import TestCase
+import threading
+import zlib
+from decimal import Decimal
+from unittest import skipIf
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
 from django.test.client import RequestFactory
 from django.core.serializers.json import DjangoJSONEncoder
 from django.http import HttpResponseBadRequest, HttpResponse
 from django.views.generic import View
-from djangular.views.mixins import JSONResponseMixin, allowed_action
+from django.core.cache import cache
+from django.contrib.auth.models import User, Group, AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count
+from djangular.core import concurrency, jobs, singleflight, writebehind
+from djangular.core import updates
+from djangular.core.updates import publish_update, get_updates_since
+from djangular.views.action_cache import invalidate_cached_actions
+from djangular.forms.angular_base import BaseCrudForm
+from djangular.views.auth import NgLoggedInUserView
+from djangular.testing import CRUDQueriesMixin
+from djangular.views.crud import NgCRUDView, QueryBudgetExceeded, to_columns, extra
+from djangular.views.encoding import msgpack, encode_payload
+from djangular.views.instrumentation import request_instrumented
+from server.models import Project, Milestone
+from djangular.views import mixins
+from djangular.views.mixins import JSONResponseMixin, allowed_action, get_related_lookups, prefetch_concurrently
+from djangular.views.serialization import get_serialization_plan
 
 
 class JSONResponseView(JSONResponseMixin, View):
@@ -20,6 +44,12 @@ class JSONResponseView(JSONResponseMixin, View):
         return { 'success': True }
 
 
+class CountingView(JSONResponseMixin, View):
+    @allowed_action
+    def count_users(self, in_data):
+        return {'count': User.objects.count()}
+
+
 class DummyView(View):
     def get(self, request, *args, **kwargs):
         return HttpResponse('GET OK')
@@ -101,3 +131,873 @@ class JSONResponseMixinTest(TestCase):
         response = DummyResponseView.as_view()(request)
         self.assertIsInstance(response, HttpResponse)
         self.assertEqual(response.content, 'GET OK')
+
+
+class LoggedInUserView(NgLoggedInUserView):
+    def build_model_dict(self, obj, relations={}, fields=[]):
+        return [{'pk': obj.pk, 'username': obj.username, 'groups': [g.name for g in obj.groups.all()]}]
+
+
+class NgLoggedInUserViewTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.clear()
+        self.user = User.objects.create(username='john')
+
+    def get_response(self, **extra):
+        request = self.factory.get('/logged-in-user/?relations={"groups":{}}', **extra)
+        request.user = User.objects.get(pk=self.user.pk)
+        return LoggedInUserView.as_view()(request, action='get_data')
+
+    def test_anonymous_user(self):
+        request = self.factory.get('/logged-in-user/')
+        request.user = AnonymousUser()
+        response = LoggedInUserView.as_view()(request, action='get_data')
+        self.assertEqual(json.loads(response.content), {})
+
+    def test_cached_payload(self):
+        self.assertEqual(json.loads(self.get_response().content)['username'], 'john')
+        request = self.factory.get('/logged-in-user/?relations={"groups":{}}')
+        request.user = self.user
+        with self.assertNumQueries(0):
+            LoggedInUserView.as_view()(request, action='get_data')
+
+    def test_invalidation(self):
+        self.get_response()
+        self.user.username = 'johnny'
+        self.user.save()
+        self.assertEqual(json.loads(self.get_response().content)['username'], 'johnny')
+        self.user.groups.add(Group.objects.create(name='staff'))
+        self.assertEqual(json.loads(self.get_response().content)['groups'], ['staff'])
+
+    def test_etag(self):
+        response = self.get_response()
+        response = self.get_response(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_malformed_relations(self):
+        request = self.factory.get('/logged-in-user/?relations={groups')
+        request.user = self.user
+        response = LoggedInUserView.as_view()(request, action='get_data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_serialized_relations(self):
+        self.user.groups.add(Group.objects.create(name='staff'))
+        request = self.factory.get('/logged-in-user/', {'relations': '{"groups": {"fields": ["name"]}}'})
+        request.user = self.user
+        data = json.loads(NgLoggedInUserView.as_view()(request, action='get_data').content)
+        self.assertEqual(data['username'], 'john')
+        self.assertEqual([group['name'] for group in data['groups']], ['staff'])
+
+    def test_related_lookups(self):
+        select, prefetch = get_related_lookups(User, {'groups': {'relations': {'permissions': {}}}, 'username': {}})
+        self.assertListEqual(select, [])
+        self.assertListEqual(prefetch, ['groups', 'groups__permissions'])
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.received = []
+        request_instrumented.connect(self.receiver)
+
+    def tearDown(self):
+        request_instrumented.disconnect(self.receiver)
+
+    def receiver(self, sender, **kwargs):
+        self.received.append(kwargs)
+
+    def post(self, view):
+        request = self.factory.post('/dummy.json', data=json.dumps({'action': 'count_users'}),
+            content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        return view(request)
+
+    def test_disabled(self):
+        response = self.post(CountingView.as_view())
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertFalse(self.received)
+
+    def test_server_timing(self):
+        response = self.post(CountingView.as_view(instrument=True))
+        timing = response['Server-Timing']
+        for metric in ('decode;dur=', 'action;dur=', 'encode;dur=', 'total;dur=', 'desc="1 queries"'):
+            self.assertIn(metric, timing)
+        self.assertEqual(len(self.received), 1)
+        self.assertEqual(self.received[0]['queries'], 1)
+        self.assertEqual(self.received[0]['size'], len(response.content))
+
+
+class ProjectCRUDView(NgCRUDView):
+    model_class = Project
+    max_relations = 3
+    max_relations_depth = 2
+    query_budget = 4
+
+    def build_model_dict(self, obj=None):
+        # serializes the relation 'milestones' naively, one query per project
+        obj = obj or self.model_obj
+        data = {'pk': obj.pk, 'name': obj.name}
+        if 'milestones' in self.relations:
+            data['milestones'] = [m.title for m in obj.milestones.all()]
+        return [data]
+
+
+class QueryBudgetTest(CRUDQueriesMixin, TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        owner = User.objects.create(username='owner')
+        for i in range(5):
+            project = Project.objects.create(name='Project %d' % i, owner=owner)
+            Milestone.objects.create(project=project, title='Milestone %d' % i)
+
+    def get(self, relations):
+        request = self.factory.get('/crud/', {'relations': json.dumps(relations)})
+        return ProjectCRUDView.as_view()(request)
+
+    def test_relations_limits(self):
+        response = self.get({'owner': {'relations': {'groups': {'relations': {'permissions': {}}}}}})
+        self.assertIsInstance(response, HttpResponseBadRequest)
+        response = self.get({'owner': {}, 'members': {}, 'milestones': {}, 'posts': {}})
+        self.assertIsInstance(response, HttpResponseBadRequest)
+
+    def test_within_budget(self):
+        self.assertRelationsNumQueries(1, ProjectCRUDView, {})
+
+    def test_budget_exceeded(self):
+        view = type('StrictProjectCRUDView', (ProjectCRUDView,), {'query_budget_strict': True})
+        self.assertRaises(QueryBudgetExceeded, self.assertRelationsNumQueries, 4, view, {'milestones': {}})
+
+    def test_budget_logged(self):
+        view = type('LaxProjectCRUDView', (ProjectCRUDView,), {'query_budget_strict': False})
+        response = self.assertRelationsNumQueries(6, view, {'milestones': {}})
+        self.assertEqual(len(json.loads(response.content)), 5)
+
+
+class CompressedView(JSONResponseMixin, View):
+    compress = True
+
+    @allowed_action
+    def list_numbers(self, in_data):
+        return {'numbers': range(in_data.get('count', 1000))}
+
+
+class CompressionTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def post(self, count, **extra):
+        request = self.factory.post('/dummy.json', data=json.dumps({'action': 'list_numbers', 'count': count}),
+                                    content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+                                    **extra)
+        return CompressedView.as_view()(request)
+
+    def test_gzip(self):
+        response = self.post(1000, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        content = zlib.decompress(response.content, 16 + zlib.MAX_WBITS)
+        self.assertEqual(json.loads(content), {'numbers': range(1000)})
+
+    def test_below_min_length(self):
+        response = self.post(10, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(response.content), {'numbers': range(10)})
+
+    def test_not_accepted(self):
+        response = self.post(1000)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.post(1000, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(response.content), {'numbers': range(1000)})
+
+    def test_streamed_query(self):
+        project = Project.objects.create(name='Project', owner=User.objects.create(username='owner'))
+        view = type('StreamingProjectCRUDView', (ProjectCRUDView,), {'stream_query': True, 'compress': True})
+        response = view.as_view()(self.factory.get('/crud/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = zlib.decompress(''.join(response.streaming_content), 16 + zlib.MAX_WBITS)
+        self.assertEqual(json.loads(content), [{'pk': project.pk, 'name': 'Project'}])
+
+
+class ColumnsFormatTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        owner = User.objects.create(username='owner')
+        self.projects = [Project.objects.create(name='Project %d' % i, owner=owner) for i in range(3)]
+
+    def test_to_columns(self):
+        data = to_columns([{'a': 1, 'b': 2}, {'a': 3, 'c': 4}])
+        self.assertEqual(data['columns'], ['a', 'b', 'c'])
+        self.assertEqual(data['rows'], [[1, 2, None], [3, None, 4]])
+
+    def test_query_parameter(self):
+        request = self.factory.get('/crud/', {'format': 'columns', 'name': 'Project 1'})
+        data = json.loads(ProjectCRUDView.as_view()(request).content)
+        self.assertEqual(len(data['rows']), 1)
+        self.assertEqual(dict(zip(data['columns'], data['rows'][0])), {'pk': self.projects[1].pk, 'name': 'Project 1'})
+
+    def test_accept_header(self):
+        request = self.factory.get('/crud/', HTTP_ACCEPT='application/vnd.djangular.columns+json')
+        response = ProjectCRUDView.as_view()(request)
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(len(json.loads(response.content)['rows']), 3)
+        response = ProjectCRUDView.as_view()(self.factory.get('/crud/'))
+        self.assertEqual(len(json.loads(response.content)), 3)
+        response = ProjectCRUDView.as_view(columns_media_type=None)(self.factory.get('/crud/'))
+        self.assertFalse(response.has_header('Vary'))
+
+
+class MsgpackView(JSONResponseMixin, View):
+    msgpack = True
+
+    @allowed_action
+    def echo(self, in_data):
+        return {'echo': in_data}
+
+
+@skipIf(msgpack is None, 'msgpack is not installed')
+class MsgpackTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_negotiation(self):
+        data = msgpack.packb({'action': 'echo', 'values': [1, 2.5, u'ä']}, use_bin_type=True)
+        request = self.factory.post('/dummy.json', data=data, content_type='application/x-msgpack',
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_ACCEPT='application/x-msgpack')
+        response = MsgpackView.as_view()(request)
+        self.assertEqual(response['Content-Type'], 'application/x-msgpack')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), {'echo': {'values': [1, 2.5, u'ä']}})
+
+    def test_json_fallback(self):
+        request = self.factory.post('/dummy.json', data=json.dumps({'action': 'echo', 'foo': 'bar'}),
+                                    content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        response = MsgpackView.as_view()(request)
+        self.assertEqual(json.loads(response.content), {'echo': {'foo': 'bar'}})
+
+    def test_disabled(self):
+        data = msgpack.packb({'action': 'action_one'})
+        request = self.factory.post('/dummy.json', data=data, content_type='application/x-msgpack',
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_ACCEPT='application/x-msgpack')
+        response = JSONResponseView.as_view()(request)
+        self.assertIsInstance(response, HttpResponseBadRequest)
+
+    def test_crud_query(self):
+        Project.objects.create(name='Project', owner=User.objects.create(username='owner'), budget='12.50')
+        view = type('MsgpackProjectCRUDView', (ProjectCRUDView,), {'msgpack': True, 'stream_query': True})
+        response = view.as_view()(self.factory.get('/crud/', HTTP_ACCEPT='application/x-msgpack'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(msgpack.unpackb(response.content, raw=False)[0]['name'], 'Project')
+
+    def test_string_keys(self):
+        request = self.factory.get('/dummy.json', HTTP_ACCEPT='application/x-msgpack')
+        content, content_type = encode_payload(MsgpackView(), request, {'pk': 1, 'name': u'x'})
+        # both keys are packed as strings (fixstr 0xa2 and 0xa4), none as binary (0xc4)
+        self.assertNotIn('\xc4', content)
+        self.assertIn('\xa2pk', content)
+        self.assertIn('\xa4name', content)
+
+
+class GatherView(JSONResponseMixin, View):
+    @allowed_action
+    def count_all(self, in_data):
+        users, groups = self.gather(User.objects.count, Group.objects.count)
+        return {'users': users, 'groups': groups}
+
+
+class ConcurrencyTest(TestCase):
+    def test_serial_within_transaction(self):
+        User.objects.create(username='john')
+        request = RequestFactory().post('/dummy.json', data=json.dumps({'action': 'count_all'}),
+                                        content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        response = GatherView.as_view()(request)
+        self.assertEqual(json.loads(response.content), {'users': 1, 'groups': 0})
+
+    def test_concurrent(self):
+        first, second = threading.Event(), threading.Event()
+
+        def wait_for(own, other):
+            own.set()
+            return other.wait(5) or other.is_set()
+
+        def fail():
+            raise KeyError('failed')
+
+        can_run_concurrently = concurrency.can_run_concurrently
+        concurrency.can_run_concurrently = lambda: True
+        try:
+            results = concurrency.run_concurrently(lambda: wait_for(first, second), lambda: wait_for(second, first),
+                                                   lambda: 3)
+            self.assertEqual(results, [True, True, 3])
+            self.assertRaises(KeyError, concurrency.run_concurrently, lambda: 1, fail)
+        finally:
+            concurrency.can_run_concurrently = can_run_concurrently
+
+
+    def release(self, conn_max_age):
+        closed = []
+
+        def worker():
+            wrapper = connections[DEFAULT_DB_ALIAS]
+            wrapper.settings_dict = dict(wrapper.settings_dict, CONN_MAX_AGE=conn_max_age)
+            wrapper.close = lambda: closed.append(True)
+            concurrency._run_in_pool(wrapper.cursor)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        return closed
+
+    def test_worker_connections_closed(self):
+        self.assertEqual(self.release(0), [True])
+
+    @skipIf(not hasattr(connection, 'in_atomic_block'), 'Django 1.5 closes the connections of workers')
+    def test_worker_connections_kept(self):
+        self.assertEqual(self.release(60), [])
+
+
+class PoolConcurrencyTest(TransactionTestCase):
+    def test_pool(self):
+        # the test database is stored in a file, hence the workers see the committed rows
+        User.objects.create(username='john')
+        Group.objects.create(name='staff')
+        self.assertTrue(concurrency.can_run_concurrently())
+        request = RequestFactory().post('/dummy.json', data=json.dumps({'action': 'count_all'}),
+                                        content_type='application/json', HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(json.loads(GatherView.as_view()(request).content), {'users': 1, 'groups': 1})
+        threads = concurrency.run_concurrently(lambda: threading.current_thread().name,
+                                               lambda: threading.current_thread().name)
+        self.assertNotIn(threading.current_thread().name, threads)
+
+
+class ConcurrentRelationsTest(CRUDQueriesMixin, TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        for i in range(5):
+            project = Project.objects.create(name='Project %d' % i, owner=owner)
+            project.members.add(owner)
+            Milestone.objects.create(project=project, title='Milestone %d' % i)
+
+    def test_prefetch_concurrently(self):
+        projects = list(Project.objects.order_by('pk'))
+        with self.assertNumQueries(2):
+            prefetch_concurrently(projects, ['members', 'milestones'])
+        with self.assertNumQueries(0):
+            self.assertEqual([p.milestones.all()[0].title for p in projects], ['Milestone %d' % i for i in range(5)])
+            self.assertEqual([p.members.all()[0].username for p in projects], ['owner'] * 5)
+
+    def test_crud_view(self):
+        view = type('ConcurrentProjectCRUDView', (ProjectCRUDView,), {'concurrent_relations': True})
+        response = self.assertRelationsNumQueries(3, view, {'milestones': {}, 'members': {}})
+        self.assertEqual(len(json.loads(response.content)), 5)
+
+
+class ExtrasProjectCRUDView(ProjectCRUDView):
+    @extra(bulk=True)
+    def milestone_count(self, projects):
+        counts = Milestone.objects.filter(project__in=projects).values_list('project').annotate(Count('pk'))
+        return dict((project.pk, dict(counts).get(project.pk, 0)) for project in projects)
+
+    @extra(annotate={'num_members': Count('members')})
+    def member_count(self, project):
+        return project.num_members
+
+    @extra(prefetch_related=['milestones'])
+    def open_milestones(self, project):
+        return [milestone.title for milestone in project.milestones.all() if not milestone.done]
+
+
+class ExtrasTest(CRUDQueriesMixin, TestCase):
+    def setUp(self):
+        owner = User.objects.create(username='owner')
+        for i in range(5):
+            project = Project.objects.create(name='Project %d' % i, owner=owner)
+            project.members.add(owner)
+            Milestone.objects.create(project=project, title='Milestone %d' % i)
+            Milestone.objects.create(project=project, title='Done %d' % i, done=True)
+        self.project = project
+
+    def test_query(self):
+        extras = ['milestone_count', 'member_count', 'open_milestones']
+        response = self.assertRelationsNumQueries(3, ExtrasProjectCRUDView, {}, extras)
+        data = sorted(json.loads(response.content), key=lambda obj: obj['pk'])
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['milestone_count'], 2)
+        self.assertEqual(data[0]['member_count'], 1)
+        self.assertEqual(data[4]['open_milestones'], ['Milestone 4'])
+
+    def test_get(self):
+        response = self.assertRelationsNumQueries(3, ExtrasProjectCRUDView, {},
+                                                  ['milestone_count', 'open_milestones'], pk=self.project.pk)
+        data = json.loads(response.content)
+        self.assertEqual(data['milestone_count'], 2)
+        self.assertEqual(data['open_milestones'], ['Milestone 4'])
+
+    def test_streamed(self):
+        view = type('StreamingExtrasProjectCRUDView', (ExtrasProjectCRUDView,), {'stream_query': True,
+                                                                                  'stream_chunk_size': 2})
+        request = RequestFactory().get('/crud/', {'extras': 'milestone_count'})
+        data = json.loads(''.join(view.as_view()(request).streaming_content))
+        self.assertEqual([obj['milestone_count'] for obj in data], [2] * 5)
+
+
+class PlainProjectCRUDView(NgCRUDView):
+    model_class = Project
+
+
+class SerializationTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner', email='owner@example.com')
+        self.project = Project.objects.create(name='Project', owner=self.owner, budget='12.50')
+        self.project.members.add(self.owner)
+        self.milestone = Milestone.objects.create(project=self.project, title='Milestone')
+
+    def get(self, relations, **kwargs):
+        request = RequestFactory().get('/crud/', {'relations': json.dumps(relations)})
+        return json.loads(PlainProjectCRUDView.as_view()(request, **kwargs).content)
+
+    def test_fields(self):
+        data = self.get({}, pk=self.project.pk)
+        self.assertEqual(data['pk'], self.project.pk)
+        self.assertEqual(data['name'], 'Project')
+        self.assertEqual(data['owner'], self.owner.pk)
+        self.assertEqual(data['members'], [self.owner.pk])
+        self.assertEqual(Decimal(data['budget']), Decimal('12.50'))
+
+    def test_relations(self):
+        relations = {'owner': {'fields': ['username']}, 'milestones': {'excludes': ['due_date', 'done']}}
+        data = self.get(relations)[0]
+        self.assertEqual(data['owner'], {'pk': self.owner.pk, 'username': 'owner'})
+        self.assertEqual(data['milestones'], [{'pk': self.milestone.pk, 'project': self.project.pk,
+                                                'title': 'Milestone'}])
+
+    def test_allowed_extras(self):
+        Project.is_big = property(lambda project: project.budget > 10)
+        try:
+            relations = {'owner': {'fields': ['username'], 'extras': ['delete']}}
+            request = RequestFactory().get('/crud/', {'relations': json.dumps(relations), 'extras': 'is_big,delete'})
+            view = type('AllowedExtrasProjectCRUDView', (PlainProjectCRUDView,), {'allowed_extras': ('is_big',)})
+            data = json.loads(view.as_view()(request).content)[0]
+            self.assertTrue(data['is_big'])
+            self.assertNotIn('delete', data)
+            self.assertNotIn('delete', data['owner'])
+            self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
+            self.assertTrue(User.objects.filter(pk=self.owner.pk).exists())
+        finally:
+            del Project.is_big
+
+    def test_sensitive_fields(self):
+        data = self.get({'owner': {'fields': ['username', 'password']}})[0]
+        self.assertEqual(data['owner'], {'pk': self.owner.pk, 'username': 'owner'})
+        data = self.get({'owner': {}})[0]
+        self.assertNotIn('password', data['owner'])
+
+    def test_plans_are_cached(self):
+        relations = {'owner': {'fields': ['username']}}
+        plan = get_serialization_plan(Project, relations, ['extra'])
+        self.assertIs(get_serialization_plan(Project, {'owner': {'fields': ['username']}}, ['extra']), plan)
+        self.assertIsNot(get_serialization_plan(Project, relations), plan)
+        self.assertIs(plan.nested[0][2], get_serialization_plan(User, None, fields=['username']))
+
+
+class ProjectForm(BaseCrudForm):
+    class Meta:
+        model = Project
+        fields = ('name', 'owner', 'budget')
+
+
+class ReplicaProjectCRUDView(PlainProjectCRUDView):
+    create_form_class = ProjectForm
+    read_database = 'replica'
+
+
+class ReplicaRoutingTest(TestCase):
+    multi_db = True
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.owner = User.objects.create(username='owner')
+        Project.objects.using('replica').create(name='Replicated', owner_id=self.owner.pk)
+
+    def query(self, session):
+        request = self.factory.get('/crud/')
+        request.session = session
+        return [obj['name'] for obj in json.loads(ReplicaProjectCRUDView.as_view()(request).content)]
+
+    def test_reads_from_replica(self):
+        Project.objects.create(name='Primary', owner=self.owner)
+        self.assertEqual(self.query({}), ['Replicated'])
+
+    def test_read_your_writes(self):
+        session = {}
+        request = self.factory.post('/crud/', data=json.dumps({'name': 'Written', 'owner': self.owner.pk, 'budget': '1.00'}),
+                                    content_type='application/json')
+        request.session = session
+        response = ReplicaProjectCRUDView.as_view()(request)
+        self.assertEqual(json.loads(response.content)['name'], 'Written')
+        self.assertEqual(Project.objects.using('default').get().name, 'Written')
+        self.assertEqual(self.query(session), ['Written'])
+        self.assertEqual(self.query({}), ['Replicated'])
+
+    def test_no_replica(self):
+        session = {}
+        request = self.factory.post('/crud/', data=json.dumps({'name': 'Written', 'owner': self.owner.pk, 'budget': '1.00'}),
+                                    content_type='application/json')
+        request.session = session
+        view = type('PrimaryProjectCRUDView', (ReplicaProjectCRUDView,), {'read_database': None})
+        self.assertEqual(view.as_view()(request).status_code, 200)
+        self.assertEqual(session, {})
+
+
+class CachedActionView(JSONResponseMixin, View):
+    calls = []
+
+    @allowed_action(cache_timeout=60, cache_key=('owner',), cache_tags=(Project,))
+    def project_names(self, in_data):
+        self.calls.append('project_names')
+        return [project.name for project in Project.objects.filter(owner_id=in_data['owner'])]
+
+    @allowed_action(cache_timeout=60, vary_on_user=True, cache_tags=('greeting',))
+    def greet(self):
+        self.calls.append('greet')
+        return {'greeting': 'Hello %s' % self.request.user.username}
+
+
+class ActionCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        CachedActionView.calls = []
+        self.factory = RequestFactory()
+        self.owner = User.objects.create(username='owner')
+        Project.objects.create(name='Apollo', owner=self.owner)
+
+    def post(self, **in_data):
+        in_data.update(action='project_names')
+        request = self.factory.post('/dummy.json', data=json.dumps(in_data), content_type='application/json',
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        return json.loads(CachedActionView.as_view()(request).content)
+
+    def get(self, user):
+        request = self.factory.get('/dummy.json')
+        request.user = user
+        return json.loads(CachedActionView.as_view()(request, action='greet').content)
+
+    def test_cache_key(self):
+        self.assertEqual(self.post(owner=self.owner.pk), ['Apollo'])
+        self.assertEqual(self.post(owner=self.owner.pk, page=2), ['Apollo'])
+        self.assertEqual(CachedActionView.calls, ['project_names'])
+        self.assertEqual(self.post(owner=0), [])
+        self.assertEqual(len(CachedActionView.calls), 2)
+
+    def test_model_tag(self):
+        self.post(owner=self.owner.pk)
+        Project.objects.create(name='Gemini', owner=self.owner)
+        self.assertEqual(sorted(self.post(owner=self.owner.pk)), ['Apollo', 'Gemini'])
+        Project.objects.filter(name='Gemini').delete()
+        self.assertEqual(self.post(owner=self.owner.pk), ['Apollo'])
+        self.assertEqual(len(CachedActionView.calls), 3)
+
+    def test_vary_on_user(self):
+        other = User.objects.create(username='other')
+        self.assertEqual(self.get(self.owner), {'greeting': 'Hello owner'})
+        self.assertEqual(self.get(other), {'greeting': 'Hello other'})
+        self.assertEqual(self.get(self.owner), {'greeting': 'Hello owner'})
+        self.assertEqual(len(CachedActionView.calls), 2)
+        invalidate_cached_actions('greeting')
+        self.get(self.owner)
+        self.assertEqual(len(CachedActionView.calls), 3)
+
+    def test_follower_does_not_store(self):
+        # a follower of the flight receives the result of the leader, which stored it already
+        single_flight = mixins.single_flight
+        mixins.single_flight = lambda key, func: ('["Shared"]', 'application/json')
+        try:
+            self.assertEqual(self.post(owner=self.owner.pk), ['Shared'])
+        finally:
+            mixins.single_flight = single_flight
+        self.assertEqual(self.post(owner=self.owner.pk), ['Apollo'])
+
+
+class JobView(JSONResponseMixin, View):
+    @allowed_action(background=True)
+    def build_report(self, in_data):
+        return {'total': in_data['a'] + in_data['b']}
+
+    @allowed_action(background=True)
+    def import_data(self, in_data):
+        raise ValueError('Invalid file format')
+
+
+class BackgroundJobTest(TestCase):
+    urls = 'djangular.urls'
+
+    def setUp(self):
+        cache.clear()
+        self.executor = jobs._executor
+        jobs._executor = jobs.ImmediateExecutor()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        jobs._executor = self.executor
+
+    def submit(self, **in_data):
+        request = self.factory.post('/dummy.json', data=json.dumps(in_data), content_type='application/json',
+                                    HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        response = JobView.as_view()(request)
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = request.session.session_key
+        return response
+
+    def test_accepted(self):
+        response = self.submit(action='build_report', a=1, b=2)
+        self.assertEqual(response.status_code, 202)
+        job = json.loads(response.content)
+        self.assertEqual(job['url'], '/jobs/%s/' % job['job'])
+        self.assertEqual(response['Location'], 'http://testserver' + job['url'])
+        state = json.loads(self.client.get(job['url']).content)
+        self.assertEqual(state, {'job': job['job'], 'status': 'done', 'result': {'total': 3}})
+
+    def test_failed(self):
+        job = json.loads(self.submit(action='import_data').content)
+        state = json.loads(self.client.get(job['url']).content)
+        self.assertEqual(state['status'], 'failed')
+        self.assertEqual(state['error'], 'Invalid file format')
+
+    def test_owner(self):
+        state = jobs.submit_job(lambda: 42, {'user': 'john', 'session': None})
+        response = self.client.get('/jobs/%s/' % state['job'])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(jobs.get_job(state['job'])['result'], 42)
+        state = jobs.submit_job(lambda: 42, {'user': None, 'session': None})
+        response = self.client.get('/jobs/%s/' % state['job'])
+        self.assertEqual(response.status_code, 404)
+
+    def test_inline_keeps_connection(self):
+        closed, wrapper = [], connections[DEFAULT_DB_ALIAS]
+        wrapper.close = lambda: closed.append(True)
+        try:
+            state = jobs.submit_job(User.objects.count)
+        finally:
+            del wrapper.close
+        self.assertEqual(jobs.get_job(state['job'])['result'], 0)
+        self.assertEqual(closed, [])
+
+    def test_thread_pool(self):
+        jobs._executor = jobs.ThreadPoolExecutor()
+        started = threading.Event()
+        state = jobs.submit_job(lambda: started.wait(5) and 'finished')
+        started.set()
+        for _ in range(500):
+            if jobs.get_job(state['job'])['status'] == 'done':
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(jobs.get_job(state['job'])['result'], 'finished')
+
+
+class SingleFlightTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def collapse(self, func, count=5, **kwargs):
+        results, threads = [], []
+        for _ in range(count):
+            thread = threading.Thread(target=lambda: results.append(singleflight.single_flight('key', func, **kwargs)))
+            thread.start()
+            threads.append(thread)
+        return threads, results
+
+    def test_collapse(self):
+        calls, release = [], threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'payload'
+
+        threads, results = self.collapse(compute)
+        while not calls:
+            release.wait(0.01)
+        # give the other threads time to join the flight
+        threading.Event().wait(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['payload'] * 5)
+        self.assertEqual(singleflight.single_flight('key', lambda: 'next'), 'next')
+
+    def test_hanging_leader(self):
+        release = threading.Event()
+        leader = threading.Thread(target=singleflight.single_flight, args=('key', lambda: release.wait(5)))
+        leader.start()
+        while 'key' not in singleflight._flights:
+            release.wait(0.01)
+        with self.settings(DJANGULAR_SINGLE_FLIGHT_TIMEOUT=0.05):
+            self.assertEqual(singleflight.single_flight('key', lambda: 'local'), 'local')
+        release.set()
+        leader.join()
+
+    def test_error(self):
+        def fail():
+            raise ValueError('Broken')
+        self.assertRaises(ValueError, singleflight.single_flight, 'key', fail)
+        self.assertFalse(singleflight._flights)
+
+    def test_shared(self):
+        # another process holds the lock, and stores its result after a while
+        digest = singleflight.hashlib.md5('key').hexdigest()
+        cache.set(singleflight.FLIGHT_LOCK_KEY % digest, 'token', 10)
+        timer = threading.Timer(0.05, lambda: cache.set(singleflight.FLIGHT_RESULT_KEY % (digest, 'token'), 'shared'))
+        timer.start()
+        self.assertEqual(singleflight.single_flight('key', lambda: 'local', shared=True), 'shared')
+        timer.join()
+        cache.delete(singleflight.FLIGHT_LOCK_KEY % digest)
+        self.assertEqual(singleflight.single_flight('key', lambda: 'local', shared=True), 'local')
+
+    def test_crud_key(self):
+        owner = User.objects.create(username='owner')
+        Project.objects.create(name='Apollo', owner=owner)
+        factory = RequestFactory()
+        view = PlainProjectCRUDView.as_view(single_flight=True)
+        response = view(factory.get('/crud/', {'relations': '{"owner": {}}'}))
+        self.assertEqual(json.loads(response.content)[0]['owner']['username'], 'owner')
+
+        def key(user, **params):
+            view = PlainProjectCRUDView()
+            view.request = factory.get('/crud/', params)
+            view.request.user = user
+            view.prepare_relations_and_extras(view.request)
+            return view.get_single_flight_key()
+        self.assertEqual(key(AnonymousUser(), name='Apollo'), key(AnonymousUser(), name='Apollo'))
+        self.assertNotEqual(key(AnonymousUser(), name='Apollo'), key(AnonymousUser(), name='Gemini'))
+        self.assertNotEqual(key(AnonymousUser()), key(owner))
+
+
+class WriteBehindMilestoneCRUDView(NgCRUDView):
+    model_class = Milestone
+    write_behind = True
+    write_behind_delay = 0.3
+
+
+class WriteBehindTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.owner = User.objects.create(username='owner')
+        self.project = Project.objects.create(name='Apollo', owner=self.owner)
+        self.milestone = Milestone.objects.create(project=self.project, title='Launch')
+
+    def patch(self, query, responses=None):
+        request = self.factory.generic('PATCH', '/crud/?' + query)
+        response = WriteBehindMilestoneCRUDView.as_view()(request, pk=self.milestone.pk)
+        if responses is not None:
+            responses.append(response)
+        return response
+
+    def test_coalesce(self):
+        # the first request opens the batch, the others join it while it waits
+        responses, threads = [], []
+        for delay, query in ((0.05, 'title=Orbit'), (0.1, 'done=true'), (0.15, 'title=Landing')):
+            thread = threading.Timer(delay, self.patch, (query, responses))
+            thread.start()
+            threads.append(thread)
+        with self.assertNumQueries(2):
+            response = self.patch('title=Liftoff')
+        for thread in threads:
+            thread.join()
+        self.assertEqual(response['X-Coalesced-Writes'], '4')
+        milestone = Milestone.objects.get()
+        self.assertEqual((milestone.title, milestone.done), ('Landing', True))
+        for response in responses + [response]:
+            self.assertEqual(json.loads(response.content)['title'], 'Landing')
+
+    def test_single_write(self):
+        view = WriteBehindMilestoneCRUDView.as_view(write_behind_delay=0)
+        response = view(self.factory.generic('PATCH', '/crud/?title=Orbit&due_date=24.12.2014&unknown=1'), pk=self.milestone.pk)
+        self.assertEqual(response['X-Coalesced-Writes'], '1')
+        self.assertEqual(json.loads(response.content)['due_date'], '2014-12-24')
+        view = ProjectCRUDView.as_view(write_behind=True)
+        response = view(self.factory.generic('PATCH', '/crud/?m2m-add-members=%s' % self.owner.pk), pk=self.project.pk)
+        self.assertFalse(response.has_header('X-Coalesced-Writes'))
+        self.assertEqual(list(self.project.members.all()), [self.owner])
+
+
+class WriteBehindTimeoutTest(TestCase):
+    def test_hanging_flush(self):
+        release, flushed = threading.Event(), []
+
+        def flush(fields):
+            flushed.append(fields)
+            if len(flushed) == 1:
+                release.wait(5)
+            return fields
+
+        # the follower joins the batch, while the leader waits, then the flush of the leader hangs
+        leader = threading.Thread(target=writebehind.write_behind, args=('key', {'title': 'Orbit'}, flush, 0.1))
+        leader.start()
+        while 'key' not in writebehind._batches:
+            release.wait(0.01)
+        with self.settings(DJANGULAR_WRITE_BEHIND_TIMEOUT=0.3):
+            self.assertEqual(writebehind.write_behind('key', {'done': True}, flush, 0.1), ({'done': True}, 1))
+        self.assertEqual(flushed[0], {'title': 'Orbit', 'done': True})
+        release.set()
+        leader.join()
+
+
+@override_settings(DJANGULAR_UPDATES_FACILITIES=('scores',))
+class UpdatesReplayTest(TestCase):
+    urls = 'djangular.urls'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sequence(self):
+        self.assertEqual(get_updates_since('scores', 0), [])
+        self.assertEqual(publish_update('scores', {'home': 1}), 1)
+        self.assertEqual(publish_update('scores', {'away': 1}), 2)
+        self.assertEqual(publish_update('chat', {'text': 'Goal!'}), 1)
+        self.assertEqual(get_updates_since('scores', 1), [{'seq': 2, 'data': {'away': 1}}])
+        self.assertEqual(get_updates_since('scores', 2), [])
+
+    def test_stored_before_sequence(self):
+        publish_update('scores', {'home': 1})
+        set_many = []
+
+        class RecordingCache(object):
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def set(self, key, value, timeout=None):
+                set_many.append((key, get_updates_since('scores', 1)))
+                cache.set(key, value, timeout)
+
+        updates.cache = RecordingCache()
+        try:
+            publish_update('scores', {'away': 1})
+        finally:
+            updates.cache = cache
+        self.assertEqual(set_many, [('djangular:updates:scores:2', []), ('djangular:updates:scores', [])])
+        self.assertEqual(get_updates_since('scores', 1), [{'seq': 2, 'data': {'away': 1}}])
+
+    def test_replay_view(self):
+        for minute in range(3):
+            publish_update('scores', {'minute': minute})
+        response = self.client.get('/updates/scores/', {'since': 1})
+        self.assertEqual(json.loads(response.content), {'seq': 3, 'updates': [
+            {'seq': 2, 'data': {'minute': 1}}, {'seq': 3, 'data': {'minute': 2}}]})
+        self.assertEqual(self.client.get('/updates/scores/', {'since': 'x'}).status_code, 400)
+
+    def test_permission(self):
+        publish_update('chat', {'text': 'Private'})
+        self.assertEqual(self.client.get('/updates/chat/', {'since': 0}).status_code, 403)
+
+    def test_reset(self):
+        with self.settings(DJANGULAR_UPDATES_HISTORY=2):
+            for minute in range(3):
+                publish_update('scores', {'minute': minute})
+            response = self.client.get('/updates/scores/', {'since': 0})
+            self.assertEqual(json.loads(response.content), {'seq': 3, 'reset': True})
+            cache.delete('djangular:updates:scores:3')
+            self.assertIsNone(get_updates_since('scores', 2))
+            self.assertIsNone(get_updates_since('scores', 4))